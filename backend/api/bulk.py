@@ -0,0 +1,173 @@
+"""Пакетное добавление и удаление избранного, корзины и подписок.
+
+Все id пакета проверяются одним запросом с IN, новые строки
+вставляются одним INSERT с пропуском конфликтов, а удаляются одним
+DELETE без загрузки строк. Ни то ни другое не отправляет сигналы,
+поэтому счетчики, версии, список покупок и лента здесь обновляются
+один раз на пакет так же, как их обновляют обработчики recipes.signals.
+Пакетные операции одного пользователя выполняются по очереди
+под блокировкой его строки.
+"""
+from django.db import connection, models, transaction
+
+from recipes import feeds, shopping_lists
+from recipes.counters import change_counters
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from recipes.versions import bump_versions, user_scope
+from users.models import Subscription, User
+
+ADDED = 'added'
+EXISTS = 'exists'
+REMOVED = 'removed'
+ABSENT = 'absent'
+NOT_FOUND = 'not_found'
+SELF = 'self'
+
+
+def lock_user(user):
+    User.objects.select_for_update().filter(pk=user.pk).first()
+
+
+def get_results(ids, found, changed, changed_status, unchanged_status,
+                invalid=()):
+    """Итог по каждому id в порядке запроса."""
+    results = []
+    for pk in ids:
+        if pk not in found:
+            status = NOT_FOUND
+        elif pk in invalid:
+            status = SELF
+        elif pk in changed:
+            status = changed_status
+        else:
+            status = unchanged_status
+        results.append({'id': pk, 'status': status})
+    return results
+
+
+def delete_rows(queryset):
+    """DELETE одним запросом: QuerySet.delete() при подключенных сигналах
+    загружает строки и отправляет сигналы по каждой."""
+    return queryset._raw_delete(queryset.db)
+
+
+def insert_rows(model, fields, rows, returning):
+    """INSERT с пропуском конфликтов одним запросом.
+
+    Возвращает значения поля returning только у вставленных строк:
+    строку, которую успел записать параллельный запрос, bulk_create
+    с ignore_conflicts=True пропустил бы молча.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(model._meta.get_field(name).column) for name in fields
+    )
+    values = ', '.join(
+        [f'({", ".join(["%s"] * len(fields))})'] * len(rows)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{quote(model._meta.db_table)} ({columns}) VALUES {values} '
+            f'{connection.ops.ignore_conflicts_suffix_sql(True)} '
+            f'RETURNING {quote(model._meta.get_field(returning).column)}',
+            [value for row in rows for value in row]
+        )
+        return {value for value, in cursor.fetchall()}
+
+
+def check_recipes(user, model, ids):
+    """{id рецепта: есть ли он уже у пользователя} для найденных рецептов."""
+    return dict(
+        Recipe.objects.filter(pk__in=ids).annotate(
+            added=models.Exists(model.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            ))
+        ).values_list('pk', 'added')
+    )
+
+
+@transaction.atomic
+def add_recipes(user, model, ids):
+    ids = list(dict.fromkeys(ids))
+    lock_user(user)
+    found = check_recipes(user, model, ids)
+    added = [pk for pk in ids if pk in found and not found[pk]]
+    if added:
+        inserted = insert_rows(
+            model, ('user', 'recipe'), [(user.pk, pk) for pk in added],
+            returning='recipe'
+        )
+        added = [pk for pk in added if pk in inserted]
+    if added:
+        if model is FavoriteRecipe:
+            change_counters(Recipe, added, 'favorites_count', 1)
+        elif model is ShoppingCart:
+            shopping_lists.add_recipes(user.pk, added)
+        bump_versions(user_scope(user.pk))
+    return get_results(ids, found, set(added), ADDED, EXISTS)
+
+
+@transaction.atomic
+def remove_recipes(user, model, ids):
+    ids = list(dict.fromkeys(ids))
+    lock_user(user)
+    found = check_recipes(user, model, ids)
+    removed = [pk for pk in ids if found.get(pk)]
+    if removed:
+        delete_rows(model.objects.filter(user=user, recipe_id__in=removed))
+        if model is FavoriteRecipe:
+            change_counters(Recipe, removed, 'favorites_count', -1)
+        elif model is ShoppingCart:
+            shopping_lists.remove_recipes(user.pk, removed)
+        bump_versions(user_scope(user.pk))
+    return get_results(ids, found, set(removed), REMOVED, ABSENT)
+
+
+def check_authors(user, ids):
+    """{id автора: подписан ли на него пользователь} для найденных."""
+    return dict(
+        User.objects.filter(pk__in=ids).annotate(
+            added=models.Exists(Subscription.objects.filter(
+                subscriber=user, author=models.OuterRef('pk')
+            ))
+        ).values_list('pk', 'added')
+    )
+
+
+@transaction.atomic
+def subscribe(user, ids):
+    ids = list(dict.fromkeys(ids))
+    lock_user(user)
+    found = check_authors(user, ids)
+    added = [
+        pk for pk in ids
+        if pk in found and not found[pk] and pk != user.pk
+    ]
+    if added:
+        inserted = insert_rows(
+            Subscription, ('subscriber', 'author'),
+            [(user.pk, pk) for pk in added], returning='author'
+        )
+        added = [pk for pk in added if pk in inserted]
+    if added:
+        change_counters(User, added, 'followers_count', 1)
+        feeds.follow(user.pk, added)
+        bump_versions(user_scope(user.pk))
+    return get_results(ids, found, set(added), ADDED, EXISTS, {user.pk})
+
+
+@transaction.atomic
+def unsubscribe(user, ids):
+    ids = list(dict.fromkeys(ids))
+    lock_user(user)
+    found = check_authors(user, ids)
+    removed = [pk for pk in ids if found.get(pk)]
+    if removed:
+        delete_rows(Subscription.objects.filter(
+            subscriber=user, author_id__in=removed
+        ))
+        change_counters(User, removed, 'followers_count', -1)
+        feeds.unfollow(user.pk, removed)
+        bump_versions(user_scope(user.pk))
+    return get_results(ids, found, set(removed), REMOVED, ABSENT)
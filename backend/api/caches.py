@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+from api.conditions import get_request_versions
+from recipes.ingredient_index import ingredient_index
+
+MAX_RENDERED_RESPONSES = 512
+
+
+class RenderedResponseCache:
+    """Готовые JSON-байты ответов для одной версии данных.
+
+    При смене версии все сохраненные ответы сбрасываются, так что
+    в памяти процесса живут только ответы актуальной версии.
+    """
+
+    def __init__(self, max_size=MAX_RENDERED_RESPONSES):
+        self.max_size = max_size
+        self.version = None
+        self.responses = {}
+        self._lock = Lock()
+
+    def get(self, version, key):
+        if version != self.version:
+            return None
+        return self.responses.get(key)
+
+    def set(self, version, key, content):
+        with self._lock:
+            if version != self.version:
+                self.version, self.responses = version, {}
+            if len(self.responses) >= self.max_size:
+                self.responses.clear()
+            self.responses[key] = content
+
+    def clear(self):
+        with self._lock:
+            self.version, self.responses = None, {}
+
+
+rendered_responses = []
+
+
+def prerendered(scope):
+    """Отдает JSON-ответ представления из кэша по версии области."""
+    cache = RenderedResponseCache()
+    rendered_responses.append(cache)
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            renderer = request.accepted_renderer
+            if renderer.format != 'json':
+                return view_func(request, *args, **kwargs)
+            [(version, _)] = get_request_versions(request, (scope,)).values()
+            key = (request.get_full_path(), request.accepted_media_type)
+            content = cache.get(version, key)
+            if content is None:
+                response = view_func(request, *args, **kwargs)
+                if (
+                    not isinstance(response, Response)
+                    or response.status_code != 200
+                ):
+                    return response
+                content = renderer.render(
+                    response.data, request.accepted_media_type,
+                    {'request': request, 'response': response}
+                )
+                cache.set(version, key, content)
+            return HttpResponse(content, content_type=renderer.media_type)
+        return wrapper
+    return decorator
+
+
+class RecipeBodyCache:
+    """LRU-кэш не зависящей от пользователя части рецептов.
+
+    Запись хранится под ключом (адрес сайта, id рецепта) вместе с
+    версиями рецепта, его автора, тэгов и ингредиентов и отдается,
+    только пока эти версии не изменились. Отданные словари общие для
+    всех запросов, менять их нельзя.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get_many(self, versions):
+        """{ключ: тело} для ключей {ключ: версия}, найденных в кэше."""
+        found = {}
+        with self._lock:
+            for key, version in versions.items():
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == version:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[1]
+        return found
+
+    def set_many(self, bodies):
+        """Сохраняет {ключ: (версия, тело)}."""
+        with self._lock:
+            for key, entry in bodies.items():
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+recipe_bodies = RecipeBodyCache(settings.RECIPE_BODY_CACHE_SIZE)
+
+
+def clear_caches():
+    """Сбрасывает кэши процесса, например между тестами, где версии
+    данных откатываются вместе с транзакцией."""
+    for cache in rendered_responses:
+        cache.clear()
+    recipe_bodies.clear()
+    ingredient_index.clear()
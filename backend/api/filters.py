@@ -1,36 +1,65 @@
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe, Tag
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart, Tag
+from recipes.search import search_recipes
 
 
 class IngredientFilter(SearchFilter):
     search_param = 'name'
 
 
+class IntegerFilter(filters.NumberFilter):
+    field_class = forms.IntegerField
+
+
 class RecipeFilter(filters.FilterSet):
-    author = filters.CharFilter(
-        field_name='author__id',
-        lookup_expr='icontains'
-    )
+    """Фильтры рецептов.
+
+    Автор сравнивается точно по ключу, тэги, избранное и корзина
+    проверяются через EXISTS: каждый рецепт попадает в выборку
+    один раз, а условие обслуживается составными индексами.
+    """
+
+    author = IntegerFilter(field_name='author_id')
     tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
         to_field_name='slug',
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        method='with_tags'
     )
     is_favorited = filters.BooleanFilter(method='favorited')
     is_in_shopping_cart = filters.BooleanFilter(method='in_cart')
+    search = filters.CharFilter(method='full_text_search')
 
     class Meta:
         model = Recipe
-        exclude = ('image',)
+        exclude = ('image', 'image_webp', 'image_thumbnail')
 
-    def favorited(self, queryset, name, value):
+    def with_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=[tag.pk for tag in value]
+            )
+        ))
+
+    def user_has_recipe(self, queryset, checking_model, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(favoriterecipes__user=self.request.user)
+            return queryset.filter(Exists(checking_model.objects.filter(
+                user=self.request.user, recipe_id=OuterRef('pk')
+            )))
         return queryset
 
+    def favorited(self, queryset, name, value):
+        return self.user_has_recipe(queryset, FavoriteRecipe, value)
+
     def in_cart(self, queryset, name, value):
-        if value and self.request.user.is_authenticated:
-            return queryset.filter(shoppingcarts__user=self.request.user)
+        return self.user_has_recipe(queryset, ShoppingCart, value)
+
+    def full_text_search(self, queryset, name, value):
+        if value.strip():
+            return search_recipes(queryset, value)
         return queryset
@@ -0,0 +1,386 @@
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api import bulk
+from foodgram.metrics import PERCENTILES, percentile
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from users.models import User
+
+BENCH_EMAIL = 'benchmark@foodgram.local'
+BENCH_USERNAME = 'benchmark'
+BENCH_RELATIONS = 10
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) quer')
+
+
+class BenchmarkData:
+    """Пользователь и выборки id, на которых строится трафик."""
+
+    def __init__(self, rng):
+        self.user = self.get_user()
+        self.token = Token.objects.get_or_create(user=self.user)[0].key
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        if not recipe_ids:
+            raise CommandError(
+                'No recipes in the database, seed it before benchmarking.'
+            )
+        self.recipe_ids = recipe_ids
+        self.author_ids = list(
+            Recipe.objects.order_by().values_list(
+                'author_id', flat=True
+            ).distinct()
+        )
+        self.tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        self.prefixes = sorted({
+            name[:length].lower()
+            for name in Ingredient.objects.values_list('name', flat=True)
+            for length in (1, 2, 3) if len(name) >= length
+        })
+        self.prepare_relations(rng)
+        related_ids = set(
+            FavoriteRecipe.objects.filter(
+                user=self.user
+            ).values_list('recipe_id', flat=True)
+        ) | set(
+            ShoppingCart.objects.filter(
+                user=self.user
+            ).values_list('recipe_id', flat=True)
+        )
+        self.toggle_ids = [
+            pk for pk in recipe_ids if pk not in related_ids
+        ] or recipe_ids
+
+    def get_user(self):
+        user = User.objects.filter(email=BENCH_EMAIL).first()
+        if user is None:
+            user = User.objects.create_user(
+                email=BENCH_EMAIL, username=BENCH_USERNAME,
+                first_name='Benchmark', last_name='User',
+                password=User.objects.make_random_password(),
+            )
+        return user
+
+    def prepare_relations(self, rng):
+        """Избранное, корзина и подписки для пользователя бенчмарка.
+
+        Пишутся пакетными операциями API, которые обновляют счетчики,
+        список покупок и ленту.
+        """
+        sample = rng.sample(
+            self.recipe_ids, min(BENCH_RELATIONS, len(self.recipe_ids))
+        )
+        bulk.add_recipes(self.user, FavoriteRecipe, sample)
+        bulk.add_recipes(self.user, ShoppingCart, sample)
+        authors = [pk for pk in self.author_ids if pk != self.user.pk]
+        bulk.subscribe(
+            self.user, rng.sample(authors, min(BENCH_RELATIONS, len(authors)))
+        )
+
+
+def recipes_list(data, rng):
+    return [('recipes_list', 'get', '/api/recipes/')]
+
+
+def recipes_list_tags(data, rng):
+    slugs = rng.sample(data.tag_slugs, min(2, len(data.tag_slugs)))
+    query = '&'.join(f'tags={slug}' for slug in slugs)
+    return [('recipes_list_tags', 'get', f'/api/recipes/?{query}')]
+
+
+def recipes_list_author(data, rng):
+    author_id = rng.choice(data.author_ids)
+    return [(
+        'recipes_list_author', 'get', f'/api/recipes/?author={author_id}'
+    )]
+
+
+def recipes_list_favorited(data, rng):
+    return [('recipes_list_favorited', 'get', '/api/recipes/?is_favorited=1')]
+
+
+def recipe_detail(data, rng):
+    recipe_id = rng.choice(data.recipe_ids)
+    return [('recipe_detail', 'get', f'/api/recipes/{recipe_id}/')]
+
+
+def ingredient_search(data, rng):
+    prefix = rng.choice(data.prefixes)
+    return [('ingredient_search', 'get', f'/api/ingredients/?name={prefix}')]
+
+
+def subscriptions(data, rng):
+    return [(
+        'subscriptions', 'get',
+        '/api/users/subscriptions/?recipes_limit=3'
+    )]
+
+
+def recipes_feed(data, rng):
+    return [('recipes_feed', 'get', '/api/recipes/feed/')]
+
+
+def favorite_toggle(data, rng):
+    path = f'/api/recipes/{rng.choice(data.toggle_ids)}/favorite/'
+    return [
+        ('favorite_add', 'post', path),
+        ('favorite_remove', 'delete', path),
+    ]
+
+
+def cart_toggle(data, rng):
+    path = f'/api/recipes/{rng.choice(data.toggle_ids)}/shopping_cart/'
+    return [
+        ('cart_add', 'post', path),
+        ('cart_remove', 'delete', path),
+    ]
+
+
+def download_shopping_cart(data, rng):
+    return [(
+        'download_shopping_cart', 'get',
+        '/api/recipes/download_shopping_cart/'
+    )]
+
+
+SCENARIOS = (
+    (recipes_list, 20),
+    (recipes_list_tags, 10),
+    (recipes_list_author, 5),
+    (recipes_list_favorited, 5),
+    (recipe_detail, 20),
+    (ingredient_search, 20),
+    (subscriptions, 5),
+    (recipes_feed, 5),
+    (favorite_toggle, 5),
+    (cart_toggle, 5),
+    (download_shopping_cart, 5),
+)
+
+
+def allowed_host():
+    """Хост, который пропустит проверка ALLOWED_HOSTS."""
+    return next(
+        (host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'),
+        'localhost'
+    )
+
+
+class InProcessTransport:
+    """Запросы через django.test.Client с точным подсчетом запросов к БД."""
+
+    def __init__(self, token):
+        self.client = Client(
+            HTTP_AUTHORIZATION=f'Token {token}', HTTP_HOST=allowed_host()
+        )
+
+    def request(self, method, path):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+        return response.status_code, elapsed, len(queries)
+
+
+class HttpTransport:
+    """Запросы к запущенному серверу; число запросов к БД берется
+    из заголовка Server-Timing, если сервер его отдает."""
+
+    def __init__(self, token, base_url):
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.local = threading.local()
+
+    def get_session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            session.headers['Authorization'] = f'Token {self.token}'
+        return session
+
+    def request(self, method, path):
+        start = time.perf_counter()
+        response = self.get_session().request(method, self.base_url + path)
+        elapsed = time.perf_counter() - start
+        match = SERVER_TIMING_QUERIES.search(
+            response.headers.get('Server-Timing', '')
+        )
+        return (
+            response.status_code, elapsed,
+            int(match.group(1)) if match else None
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive weighted API traffic and report latency percentiles, '
+        'throughput and queries per request for each endpoint'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server, e.g. http://127.0.0.1:8000. '
+                 'Without it requests run in-process through the test client',
+        )
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Parallel clients, only with --url',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Run only the named scenario, may be repeated',
+        )
+        parser.add_argument('--output', help='Path of the JSON report')
+        parser.add_argument(
+            '--compare', help='Previous JSON report to print deltas against'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        scenarios = [
+            (scenario, weight) for scenario, weight in SCENARIOS
+            if not options['scenarios']
+            or scenario.__name__ in options['scenarios']
+        ]
+        if not scenarios:
+            raise CommandError('No scenarios selected.')
+        data = BenchmarkData(rng)
+        if options['url']:
+            transport = HttpTransport(data.token, options['url'])
+            concurrency = options['concurrency']
+        else:
+            transport = InProcessTransport(data.token)
+            concurrency = 1
+        functions, weights = zip(*scenarios)
+        tasks = [
+            function(data, rng) for function in rng.choices(
+                functions, weights,
+                k=options['warmup'] + options['requests']
+            )
+        ]
+        for steps in tasks[:options['warmup']]:
+            self.run_task(transport, steps)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(
+                lambda steps: self.run_task(transport, steps),
+                tasks[options['warmup']:]
+            ))
+        elapsed = time.perf_counter() - start
+        report = self.build_report(results, elapsed, options, concurrency)
+        self.print_report(report)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                self.print_comparison(json.load(file), report)
+        output = options['output'] or (
+            f'benchmark-{report["meta"]["commit"] or "unknown"}.json'
+        )
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Report written to {output}'))
+
+    def run_task(self, transport, steps):
+        return [
+            (label, *transport.request(method, path))
+            for label, method, path in steps
+        ]
+
+    def build_report(self, results, elapsed, options, concurrency):
+        samples = defaultdict(list)
+        for steps in results:
+            for label, status, duration, queries in steps:
+                samples[label].append((status, duration, queries))
+        endpoints = {}
+        for label, rows in sorted(samples.items()):
+            durations = [duration * 1000 for _, duration, _ in rows]
+            queries = [count for _, _, count in rows if count is not None]
+            endpoints[label] = {
+                'requests': len(rows),
+                'errors': sum(status >= 400 for status, _, _ in rows),
+                'mean_ms': sum(durations) / len(durations),
+                **{
+                    f'p{percent}_ms': percentile(durations, percent)
+                    for percent in PERCENTILES
+                },
+                'rps': len(rows) / elapsed,
+                'queries_per_request': (
+                    sum(queries) / len(queries) if queries else None
+                ),
+            }
+        return {
+            'meta': {
+                'commit': self.get_commit(),
+                'created': timezone.now().isoformat(),
+                'mode': 'http' if options['url'] else 'in-process',
+                'database': connection.vendor,
+                'requests': options['requests'],
+                'concurrency': concurrency,
+                'seed': options['seed'],
+                'elapsed_s': elapsed,
+                'total_rps': sum(len(steps) for steps in results) / elapsed,
+            },
+            'endpoints': endpoints,
+        }
+
+    def get_commit(self):
+        try:
+            return subprocess.run(
+                ('git', 'rev-parse', '--short', 'HEAD'),
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_report(self, report):
+        self.stdout.write(
+            f'{"endpoint":26} {"n":>5} {"err":>4} {"p50":>8} {"p95":>8} '
+            f'{"p99":>8} {"rps":>8} {"queries":>8}'
+        )
+        for label, row in report['endpoints'].items():
+            queries = row['queries_per_request']
+            self.stdout.write(
+                f'{label:26} {row["requests"]:5} {row["errors"]:4} '
+                f'{row["p50_ms"]:8.2f} {row["p95_ms"]:8.2f} '
+                f'{row["p99_ms"]:8.2f} {row["rps"]:8.1f} '
+                f'{"-" if queries is None else f"{queries:.1f}":>8}'
+            )
+        self.stdout.write(f'total rps: {report["meta"]["total_rps"]:.1f}')
+
+    def print_comparison(self, previous, report):
+        self.stdout.write(
+            f'p95 vs {previous["meta"].get("commit") or "previous"}:'
+        )
+        for label, row in report['endpoints'].items():
+            old = previous['endpoints'].get(label)
+            if not old or not old['p95_ms']:
+                continue
+            change = (row['p95_ms'] / old['p95_ms'] - 1) * 100
+            self.stdout.write(
+                f'{label:26} {old["p95_ms"]:8.2f} -> '
+                f'{row["p95_ms"]:8.2f} ({change:+.1f}%)'
+            )
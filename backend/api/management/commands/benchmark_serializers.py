@@ -0,0 +1,111 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.caches import clear_caches
+from api.management.commands.benchmark import allowed_host
+from api.renderers import FastJSONRenderer
+from api.serializers import FastReadRecipeSerializer, ReadRecipeSerializer
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the CPU time per recipe of FastReadRecipeSerializer with '
+        'FastJSONRenderer and ReadRecipeSerializer with JSONRenderer, with '
+        'cold and warm process caches; byte-for-byte parity is covered by '
+        'api.tests.test_serializer_parity'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--min-speedup', type=float,
+            help='Fail if the fast path is less than this many times '
+                 'faster on the first page with warm caches',
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(favoriterecipes__isnull=False).first()
+        if user is None or not Recipe.objects.exists():
+            raise CommandError('Seed recipes and favorites before measuring.')
+        speedup = self.benchmark(user, options)
+        if options['min_speedup'] and speedup < options['min_speedup']:
+            raise CommandError(
+                f'Fast path is only {speedup:.1f}x faster, '
+                f'expected {options["min_speedup"]}x.'
+            )
+
+    @staticmethod
+    def get_request(user):
+        request = Request(APIRequestFactory().get(
+            '/api/recipes/', HTTP_HOST=allowed_host()
+        ))
+        request.user = user
+        return request
+
+    @staticmethod
+    def get_recipes(user, limit):
+        return list(Recipe.objects.with_related().with_user_flags(
+            user
+        ).order_by('-pub_date', '-id')[:limit])
+
+    @staticmethod
+    def render(serializer_class, renderer_class, recipes, request):
+        return renderer_class().render(serializer_class(
+            recipes, many=True, context={'request': request}
+        ).data)
+
+    def measure(self, serializer_class, renderer_class, recipes, request,
+                repeat, cold):
+        """Лучшее CPU-время страницы из repeat повторов в микросекундах
+        на рецепт.
+
+        Лучший из повторов меньше всего зависит от шума машины. Для
+        холодного прогона кэши процесса сбрасываются перед каждым
+        повтором, иначе все повторы после первого попадали бы в кэш тел
+        рецептов; быстрый путь тогда загружает тела запросами к БД.
+        """
+        best = float('inf')
+        for _ in range(repeat):
+            if cold:
+                clear_caches()
+            start = time.process_time()
+            self.render(serializer_class, renderer_class, recipes, request)
+            best = min(best, time.process_time() - start)
+        return best / len(recipes) * 1_000_000
+
+    def benchmark(self, user, options):
+        recipes = self.get_recipes(user, options['page_size'])
+        request = self.get_request(user)
+        timings = {}
+        self.stdout.write(f'{"":45} {"cold":>11} {"warm":>11} us CPU/recipe')
+        for name, serializer_class, renderer_class in (
+            ('ReadRecipeSerializer + JSONRenderer',
+             ReadRecipeSerializer, JSONRenderer),
+            ('FastReadRecipeSerializer + FastJSONRenderer',
+             FastReadRecipeSerializer, FastJSONRenderer),
+        ):
+            timings[name] = [
+                self.measure(
+                    serializer_class, renderer_class, recipes, request,
+                    options['repeat'], cold
+                )
+                for cold in (True, False)
+            ]
+            cold, warm = timings[name]
+            self.stdout.write(f'{name:45} {cold:11.1f} {warm:11.1f}')
+        slow, fast = timings.values()
+        speedups = [
+            slow_time / fast_time if fast_time else float('inf')
+            for slow_time, fast_time in zip(slow, fast)
+        ]
+        self.stdout.write(
+            f'{"speedup":45} {speedups[0]:10.1f}x {speedups[1]:10.1f}x'
+        )
+        return speedups[1]
@@ -0,0 +1,70 @@
+import json
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.metrics import HISTOGRAM_BUCKETS_MS
+
+
+class Command(BaseCommand):
+    help = (
+        'Show per-endpoint latency and query histograms collected by '
+        'RequestTimingMiddleware of a running server; the histograms live '
+        'in the memory of the serving process, so they are always read '
+        'over HTTP'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', required=True,
+            help='Base URL of a running server; metrics are read from '
+                 'its staff-only /api/metrics/requests/ endpoint',
+        )
+        parser.add_argument('--token', help='Staff user auth token')
+        parser.add_argument('--reset', action='store_true')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        metrics = self.fetch(options)
+        if options['json']:
+            self.stdout.write(json.dumps(metrics, indent=2))
+        elif not metrics:
+            self.stdout.write('No requests recorded yet.')
+        else:
+            self.print_table(metrics)
+
+    def fetch(self, options):
+        url = options['url'].rstrip('/') + '/api/metrics/requests/'
+        headers = (
+            {'Authorization': f'Token {options["token"]}'}
+            if options['token'] else {}
+        )
+        try:
+            response = requests.get(url, headers=headers)
+            response.raise_for_status()
+            if options['reset']:
+                requests.delete(url, headers=headers).raise_for_status()
+        except requests.RequestException as error:
+            raise CommandError(f'Cannot read metrics: {error}')
+        return response.json()
+
+    def print_table(self, metrics):
+        buckets = ''.join(
+            f'{f"<={bound}":>7}' for bound in HISTOGRAM_BUCKETS_MS
+        )
+        self.stdout.write(
+            f'{"endpoint":44} {"n":>5} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"db p95":>8} {"q avg":>6} {"q max":>6} {"dup":>4}'
+            f'{buckets}{">":>7}'
+        )
+        for label, row in metrics.items():
+            histogram = ''.join(
+                f'{count:7}' for count in row['histogram_ms'].values()
+            )
+            self.stdout.write(
+                f'{label:44} {row["requests"]:5} {row["p50_ms"]:8.2f} '
+                f'{row["p95_ms"]:8.2f} {row["p99_ms"]:8.2f} '
+                f'{row["db_p95_ms"]:8.2f} {row["queries_avg"]:6.1f} '
+                f'{row["queries_max"]:6} {row["duplicates_max"]:4}'
+                f'{histogram}'
+            )
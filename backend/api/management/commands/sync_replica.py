@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from foodgram.replicas import REPLICA_DB_ALIAS, ReplicaLag, replica_configured
+
+
+class Command(BaseCommand):
+    help = (
+        'Show the replica lag and, for a local SQLite replica, copy the '
+        'primary database into it. Run it to emulate replication: until '
+        'then the replica lags behind.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status', action='store_true',
+            help='Only show the current replica lag',
+        )
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError(
+                'No replica configured: set SQLITE_REPLICA_NAME or '
+                'POSTGRES_REPLICA_HOST / POSTGRES_REPLICA_DB.'
+            )
+        self.show_lag()
+        if options['status']:
+            return
+        primary = connections[DEFAULT_DB_ALIAS]
+        replica = connections[REPLICA_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Only SQLite replicas are copied here; a PostgreSQL replica '
+                'is kept up to date by streaming replication.'
+            )
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
+        self.show_lag()
+
+    def show_lag(self):
+        lag = ReplicaLag.measure()
+        self.stdout.write(
+            'Replica lag: ' + ('unknown' if lag is None else f'{lag:.3f}s')
+        )
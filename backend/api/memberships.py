@@ -0,0 +1,49 @@
+from django.utils.functional import cached_property
+
+from users.models import Subscription
+
+
+class UserMemberships:
+    """Избранное, корзина и подписки пользователя в памяти.
+
+    Каждое множество загружается одним запросом при первом обращении
+    и затем отвечает на проверки без обращения к базе.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._recipe_ids = {}
+
+    def recipe_ids(self, checking_model):
+        if checking_model not in self._recipe_ids:
+            self._recipe_ids[checking_model] = set(
+                checking_model.objects.filter(
+                    user=self.user
+                ).values_list('recipe_id', flat=True)
+            )
+        return self._recipe_ids[checking_model]
+
+    @cached_property
+    def author_ids(self):
+        return set(
+            Subscription.objects.filter(
+                subscriber=self.user
+            ).values_list('author_id', flat=True)
+        )
+
+    def has_recipe(self, checking_model, recipe):
+        return recipe.pk in self.recipe_ids(checking_model)
+
+    def is_subscribed(self, author):
+        return author.pk in self.author_ids
+
+
+def get_memberships(request):
+    """Возвращает членства текущего пользователя, общие для запроса."""
+    if request is None or not request.user.is_authenticated:
+        return None
+    memberships = getattr(request, '_memberships', None)
+    if memberships is None or memberships.user != request.user:
+        memberships = UserMemberships(request.user)
+        request._memberships = memberships
+    return memberships
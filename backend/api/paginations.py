@@ -1,7 +1,121 @@
-from rest_framework.pagination import PageNumberPagination
 from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination
+)
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset-пагинация рецептов по (pub_date, id).
+
+    Включается параметром ?pagination=cursor или наличием ?cursor=.
+    Не считает COUNT(*) и не использует OFFSET, поэтому стоимость
+    страницы не зависит от ее глубины, а вставка новых рецептов
+    не сдвигает уже выданные страницы. Найденные через ?search=
+    рецепты тоже идут по дате: у релевантности нет ключа для курсора.
+    """
+
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    page_size_query_param = 'limit'
+    mode_query_param = 'pagination'
+    mode = 'cursor'
+    ordering = ('-pub_date', '-id')
+
+    @classmethod
+    def is_requested(cls, request):
+        return (
+            request.query_params.get(cls.mode_query_param) == cls.mode
+            or cls.cursor_query_param in request.query_params
+        )
+
+    def encode_position(self, recipe):
+        return f'{recipe.pub_date.isoformat()}|{recipe.pk}'
+
+    def decode_position(self, position):
+        try:
+            pub_date, pk = position.split('|')
+            pub_date, pk = parse_datetime(pub_date), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def fetch(self, queryset, position, reverse, limit):
+        """До limit рецептов после позиции (pub_date, id): от новых
+        к старым или, при reverse, от старых к новым."""
+        if position is not None:
+            pub_date, pk = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+                )
+        ordering = self.ordering
+        if reverse:
+            ordering = [field.lstrip('-') for field in ordering]
+        return list(queryset.order_by(*ordering)[:limit])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.request = request
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor is not None and cursor.reverse
+        position = cursor and cursor.position
+        results = self.fetch(
+            queryset,
+            position and self.decode_position(position),
+            self.reverse,
+            self.page_size + 1
+        )
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = (
+                has_following, position is not None
+            )
+        else:
+            self.has_next, self.has_previous = (
+                has_following, position is not None
+            )
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False,
+            position=self.encode_position(self.page[-1])
+        ))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=True,
+            position=self.encode_position(self.page[0])
+        ))
+
+
+class FeedCursorPagination(RecipeCursorPagination):
+    """Keyset-пагинация ленты подписок: страницу выбирает
+    recipes.feeds.Timeline, курсор тот же, что у списка рецептов."""
+
+    def fetch(self, timeline, position, reverse, limit):
+        return timeline.fetch(position, reverse, limit)
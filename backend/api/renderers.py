@@ -0,0 +1,146 @@
+import csv
+import json
+from abc import ABCMeta, abstractmethod
+
+import orjson
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+SHOPPING_LIST_TITLE = 'Список покупок\n\n'
+SHOPPING_LIST_CSV_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson.
+
+    Байт в байт совпадает с компактным выводом JSONRenderer: даты
+    и dataclass'ы orjson передает кодировщику DRF. Ответы с отступами
+    (например, для браузерного API) рендерит JSONRenderer.
+    """
+
+    options = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+    default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if (
+            self.get_indent(accepted_media_type, renderer_context)
+            or self.ensure_ascii
+            or not self.compact
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        content = orjson.dumps(data, default=self.default,
+                               option=self.options)
+        # Как и JSONRenderer, экранируем разделители строк, которые
+        # недопустимы в JavaScript.
+        return content.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer, metaclass=ABCMeta):
+    """Базовый рендерер списка покупок.
+
+    Список отдается потоком через stream(), render() используется
+    только для ответов с ошибками: они отдаются в JSON с типом
+    application/json при любом формате списка.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer = JSONRenderer()
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = renderer.media_type
+        return renderer.render(data)
+
+    @abstractmethod
+    def stream(self, ingredients):
+        """Части файла списка из строк ingredients."""
+
+
+class TxtShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield SHOPPING_LIST_TITLE
+        separator = ''
+        for ingredient in ingredients:
+            yield (f'{separator}{ingredient["ingredient__name"]}'
+                   f' ({ingredient["ingredient__measurement_unit"]})'
+                   f' - {ingredient["amount"]}')
+            separator = '\n'
+
+
+class CsvShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(SHOPPING_LIST_CSV_HEADER)
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['ingredient__measurement_unit'],
+                ingredient['amount'],
+            ))
+
+
+class JsonShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, ingredients):
+        yield '['
+        separator = ''
+        for ingredient in ingredients:
+            yield separator + json.dumps({
+                'name': ingredient['ingredient__name'],
+                'measurement_unit': ingredient['ingredient__measurement_unit'],
+                'amount': ingredient['amount'],
+            }, ensure_ascii=False)
+            separator = ','
+        yield ']'
+
+
+class ShoppingListNegotiation(DefaultContentNegotiation):
+    """Выбирает формат только по ?format=, по умолчанию первый рендерер.
+
+    На неизвестный формат отвечает 406 со списком доступных.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        format = (
+            format_suffix
+            or request.query_params.get(api_settings.URL_FORMAT_OVERRIDE)
+            or renderers[0].format
+        )
+        for renderer in renderers:
+            if renderer.format == format:
+                return renderer, renderer.media_type
+        raise NotAcceptable(
+            f'Формат {format} не поддерживается, доступны: '
+            f'{", ".join(renderer.format for renderer in renderers)}.',
+            available_renderers=renderers
+        )
@@ -1,18 +1,36 @@
 import base64
+from functools import partial
 
 from rest_framework import serializers
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils.functional import cached_property
 from djoser.serializers import UserSerializer
 
-from users.models import User, Subscription
+from foodgram.constants import MAX_BULK_IDS, MAX_IMAGE_UPLOAD_SIZE
+from users.models import User
+from api.bulk import delete_rows
+from api.caches import recipe_bodies
+from api.conditions import get_request_versions
+from api.memberships import get_memberships
 from recipes.models import (
     Recipe,
     Ingredient,
     Tag,
     IngredientAmount,
     FavoriteRecipe,
-    ShoppingCart
+    ShoppingCart,
+    ShoppingListItem
 )
+from recipes import shopping_lists
+from recipes.images import (
+    delete_variants,
+    normalize_image,
+    schedule_image_processing
+)
+from recipes.versions import get_versions, recipe_body_scopes
+
+MAX_CACHED_IMAGE_URLS = 10000
 
 
 class AuthorSerializer(UserSerializer):
@@ -32,12 +50,12 @@ class AuthorSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, author):
-        subscriber = self.context.get('request').user
-        if not subscriber.is_authenticated:
+        if hasattr(author, 'is_subscribed'):
+            return author.is_subscribed
+        memberships = get_memberships(self.context.get('request'))
+        if memberships is None:
             return False
-        return Subscription.objects.filter(
-            subscriber=subscriber, author=author
-        ).exists()
+        return memberships.is_subscribed(author)
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -74,6 +92,40 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         )
 
 
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    """Сериализатор ингредиентов списка покупок."""
+
+    id = serializers.ReadOnlyField(source='ingredient_id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = ShoppingListItem
+        fields = (
+            'id',
+            'name',
+            'measurement_unit',
+            'amount',
+        )
+
+
+class WriteIngredientInRecipeSerializer(IngredientInRecipeSerializer):
+    """Сериализатор ингредиентов для записи.
+
+    Ингредиенты по id находятся одним запросом в WriteRecipeSerializer.
+    """
+
+    id = serializers.IntegerField()
+
+    class Meta(IngredientInRecipeSerializer.Meta):
+        fields = (
+            'id',
+            'amount',
+        )
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор тэгов."""
 
@@ -92,15 +144,37 @@ class Base64ImageField(serializers.ImageField):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
+            if len(imgstr) * 3 // 4 > MAX_IMAGE_UPLOAD_SIZE:
+                raise serializers.ValidationError(
+                    'Размер изображения не должен превышать '
+                    f'{MAX_IMAGE_UPLOAD_SIZE // (1024 * 1024)} МБ.'
+                )
 
             data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
 
-        return super().to_internal_value(data)
+        return normalize_image(super().to_internal_value(data))
+
+
+class ImageVariantField(serializers.ImageField):
+    """Ссылка на вариант изображения рецепта.
+
+    Пока фоновая обработка не построила вариант, отдается оригинал.
+    """
+
+    def __init__(self, variant, **kwargs):
+        self.variant = variant
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, recipe):
+        return getattr(recipe, self.variant) or recipe.image
 
 
 class ReadShortRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для чтения рецептов в коротком варианте."""
 
+    image = ImageVariantField('image_thumbnail')
+
     class Meta:
         model = Recipe
         fields = (
@@ -112,12 +186,10 @@ class ReadShortRecipeSerializer(serializers.ModelSerializer):
 
 
 def check_recipe(self, recipe, checking_model):
-    user = self.context['request'].user
-    if not user.is_authenticated:
+    memberships = get_memberships(self.context['request'])
+    if memberships is None:
         return False
-    return checking_model.objects.filter(
-        user=user, recipe=recipe
-    ).exists()
+    return memberships.has_recipe(checking_model, recipe)
 
 
 class ReadRecipeSerializer(serializers.ModelSerializer):
@@ -140,6 +212,8 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField(
         read_only=True
     )
+    image = ImageVariantField('image_webp')
+    thumbnail = ImageVariantField('image_thumbnail')
 
     class Meta:
         model = Recipe
@@ -152,31 +226,254 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'thumbnail',
             'text',
             'cooking_time',
         )
 
     def get_is_in_shopping_cart(self, recipe):
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
         return check_recipe(self, recipe, ShoppingCart)
 
     def get_is_favorited(self, recipe):
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
         return check_recipe(self, recipe, FavoriteRecipe)
 
+    def to_representation(self, recipe):
+        if hasattr(recipe, 'author_is_subscribed'):
+            recipe.author.is_subscribed = recipe.author_is_subscribed
+        return super().to_representation(recipe)
+
+
+class ImageUrlCache:
+    """Абсолютные ссылки на изображения по адресу сайта и имени файла.
+
+    Ссылку строят хранилище и request.build_absolute_uri, и это самая
+    дорогая часть сериализации рецепта, а набор ссылок ограничен числом
+    изображений. При переполнении кэш очищается целиком.
+    """
+
+    def __init__(self, max_size=MAX_CACHED_IMAGE_URLS):
+        self.max_size = max_size
+        self.urls = {}
+
+    def get(self, image, request, site):
+        if not image:
+            return None
+        if request is None:
+            return image.url
+        key = (site, image.name)
+        url = self.urls.get(key)
+        if url is None:
+            if len(self.urls) >= self.max_size:
+                self.urls.clear()
+            url = self.urls[key] = request.build_absolute_uri(image.url)
+        return url
+
+
+image_urls = ImageUrlCache()
+
+
+def build_recipe_body(recipe, request, site):
+    """Не зависящая от пользователя часть рецепта из with_related()."""
+    author = recipe.author
+    return {
+        'id': recipe.id,
+        'tags': [
+            {
+                'id': tag.id,
+                'name': tag.name,
+                'color': tag.color,
+                'slug': tag.slug,
+            }
+            for tag in recipe.tags.all()
+        ],
+        'author': {
+            'email': author.email,
+            'id': author.id,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+        },
+        'ingredients': [
+            {
+                'id': amount.ingredient_id,
+                'name': amount.ingredient.name,
+                'measurement_unit': amount.ingredient.measurement_unit,
+                'amount': amount.amount,
+            }
+            for amount in recipe.ingredientamounts.all()
+        ],
+        'name': recipe.name,
+        'image': image_urls.get(
+            recipe.image_webp or recipe.image, request, site
+        ),
+        'thumbnail': image_urls.get(
+            recipe.image_thumbnail or recipe.image, request, site
+        ),
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def get_recipe_bodies(recipes, request, site):
+    """{id рецепта: тело} из кэша; промахи загружаются одним
+    with_related()-запросом на всю страницу."""
+    scopes = {recipe.pk: recipe_body_scopes(recipe) for recipe in recipes}
+    all_scopes = {scope for keys in scopes.values() for scope in keys}
+    if request is not None:
+        versions = get_request_versions(request, all_scopes)
+    else:
+        versions = get_versions(all_scopes)
+    keys = {
+        (site, pk): tuple(
+            versions.get(scope, (0, None))[0] for scope in recipe_scopes
+        )
+        for pk, recipe_scopes in scopes.items()
+    }
+    bodies = {
+        pk: body for (_, pk), body in recipe_bodies.get_many(keys).items()
+    }
+    missing = [pk for pk in scopes if pk not in bodies]
+    if missing:
+        loaded = {}
+        for recipe in Recipe.objects.with_related().filter(pk__in=missing):
+            body = build_recipe_body(recipe, request, site)
+            bodies[recipe.pk] = body
+            loaded[(site, recipe.pk)] = (keys[(site, recipe.pk)], body)
+        recipe_bodies.set_many(loaded)
+    return bodies
+
+
+class FastReadRecipeListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        recipes = list(data)
+        bodies = get_recipe_bodies(
+            recipes, self.context.get('request'), self.child.site
+        )
+        # Рецепт, удаленный между выборкой страницы и загрузкой тел,
+        # пропускается.
+        return [
+            self.child.merge(recipe, bodies[recipe.pk])
+            for recipe in recipes if recipe.pk in bodies
+        ]
+
+
+class FastReadRecipeSerializer(serializers.BaseSerializer):
+    """Быстрый сериализатор для чтения рецептов.
+
+    Дает тот же результат, что и ReadRecipeSerializer. Не зависящая от
+    пользователя часть рецепта берется из общего кэша recipe_bodies,
+    промахи страницы загружаются одним пакетом, а к ней добавляются
+    флаги избранного, корзины и подписки текущего пользователя.
+    Совпадение ответов проверяет api.tests.test_serializer_parity.
+    """
+
+    class Meta:
+        list_serializer_class = FastReadRecipeListSerializer
+
+    @cached_property
+    def site(self):
+        request = self.context.get('request')
+        if request is None:
+            return None
+        return f'{request.scheme}://{request.get_host()}'
+
+    def to_representation(self, recipe):
+        body = get_recipe_bodies(
+            [recipe], self.context.get('request'), self.site
+        )[recipe.pk]
+        return self.merge(recipe, body)
+
+    def merge(self, recipe, body):
+        memberships = get_memberships(self.context.get('request'))
+        if hasattr(recipe, 'author_is_subscribed'):
+            is_subscribed = recipe.author_is_subscribed
+        else:
+            is_subscribed = (
+                memberships is not None
+                and recipe.author_id in memberships.author_ids
+            )
+        if hasattr(recipe, 'is_favorited'):
+            is_favorited = recipe.is_favorited
+        else:
+            is_favorited = check_recipe(self, recipe, FavoriteRecipe)
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            is_in_shopping_cart = recipe.is_in_shopping_cart
+        else:
+            is_in_shopping_cart = check_recipe(self, recipe, ShoppingCart)
+        return {
+            'id': body['id'],
+            'tags': body['tags'],
+            'author': {**body['author'], 'is_subscribed': is_subscribed},
+            'ingredients': body['ingredients'],
+            'is_favorited': is_favorited,
+            'is_in_shopping_cart': is_in_shopping_cart,
+            'name': body['name'],
+            'image': body['image'],
+            'thumbnail': body['thumbnail'],
+            'text': body['text'],
+            'cooking_time': body['cooking_time'],
+        }
+
 
 def create_ingredient(recipe, ingredients):
-    for ingredient in ingredients:
-        IngredientAmount.objects.create(
+    IngredientAmount.objects.bulk_create(
+        IngredientAmount(
             ingredient=ingredient['ingredient'],
             recipe=recipe,
             amount=ingredient['amount']
         )
+        for ingredient in ingredients
+    )
+
+
+def update_ingredient(recipe, ingredients):
+    """Применяет к рецепту только изменившиеся ингредиенты."""
+    old_amounts = {
+        amount.ingredient_id: amount
+        for amount in recipe.ingredientamounts.all()
+    }
+    new_ingredients = {
+        ingredient['ingredient'].id: ingredient for ingredient in ingredients
+    }
+    removed_ids = old_amounts.keys() - new_ingredients.keys()
+    if removed_ids:
+        # Одним DELETE без сигналов IngredientAmount: разница попадает
+        # в списки покупок одним change_recipe ниже.
+        delete_rows(recipe.ingredientamounts.filter(
+            ingredient_id__in=removed_ids
+        ))
+    deltas = {
+        ingredient_id: -old_amounts[ingredient_id].amount
+        for ingredient_id in removed_ids
+    }
+    changed_amounts = []
+    for ingredient_id, amount in old_amounts.items():
+        ingredient = new_ingredients.get(ingredient_id)
+        if ingredient and ingredient['amount'] != amount.amount:
+            deltas[ingredient_id] = ingredient['amount'] - amount.amount
+            amount.amount = ingredient['amount']
+            changed_amounts.append(amount)
+    if changed_amounts:
+        IngredientAmount.objects.bulk_update(changed_amounts, ('amount',))
+    created = [
+        ingredient for ingredient_id, ingredient in new_ingredients.items()
+        if ingredient_id not in old_amounts
+    ]
+    create_ingredient(recipe, created)
+    for ingredient in created:
+        deltas[ingredient['ingredient'].id] = ingredient['amount']
+    shopping_lists.change_recipe(recipe.pk, deltas)
 
 
 class WriteRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для записи рецептов."""
 
     image = Base64ImageField(required=True, allow_null=True)
-    ingredients = IngredientInRecipeSerializer(
+    ingredients = WriteIngredientInRecipeSerializer(
         many=True,
         required=True,
     )
@@ -186,6 +483,26 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
         required=True,
     )
 
+    def validate_ingredients(self, ingredients):
+        found = Ingredient.objects.in_bulk(
+            [ingredient['id'] for ingredient in ingredients]
+        )
+        missing_ids = [
+            ingredient['id'] for ingredient in ingredients
+            if ingredient['id'] not in found
+        ]
+        if missing_ids:
+            raise serializers.ValidationError(
+                f'Ингредиенты не существуют: {missing_ids}.'
+            )
+        return [
+            {
+                'ingredient': found[ingredient['id']],
+                'amount': ingredient['amount'],
+            }
+            for ingredient in ingredients
+        ]
+
     def validate(self, data):
         ingredients = data.get('ingredients')
         tags = data.get('tags')
@@ -218,15 +535,25 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         tags_ids = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe.tags.clear()
-        recipe.ingredients.clear()
         recipe.tags.set(tags_ids)
-        create_ingredient(recipe, ingredients)
+        update_ingredient(recipe, ingredients)
+        if 'image' in validated_data:
+            transaction.on_commit(partial(
+                delete_variants, recipe.image.storage,
+                (recipe.image_webp.name, recipe.image_thumbnail.name)
+            ))
+            validated_data['image_webp'] = ''
+            validated_data['image_thumbnail'] = ''
+            transaction.on_commit(
+                partial(schedule_image_processing, recipe.pk)
+            )
         return super().update(recipe, validated_data)
 
+    @transaction.atomic
     def create(self, validated_data, **kwargs):
         tags_ids = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
@@ -235,10 +562,14 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
         )
         recipe.tags.set(tags_ids)
         create_ingredient(recipe, ingredients)
+        transaction.on_commit(partial(schedule_image_processing, recipe.pk))
         return recipe
 
     def to_representation(self, recipe):
-        return ReadRecipeSerializer(recipe, context=self.context).data
+        recipe = Recipe.objects.with_user_flags(
+            self.context['request'].user
+        ).get(pk=recipe.pk)
+        return FastReadRecipeSerializer(recipe, context=self.context).data
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -267,6 +598,16 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         )
 
 
+class BulkIdsSerializer(serializers.Serializer):
+    """Список id рецептов или авторов для пакетных операций."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_IDS,
+    )
+
+
 class BaseWriteFavoriteShoppingCart(serializers.ModelSerializer):
     """Базовый сериализатор для записи избранного рецепта и корзины покупок."""
 
@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from api.caches import clear_caches
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from users.models import User
+
+
+def make_image(size=(8, 8), format='PNG', mode='RGB', exif=None):
+    buffer = BytesIO()
+    image = Image.new(mode, size, 'red')
+    if exif is None:
+        image.save(buffer, format)
+    else:
+        image.save(buffer, format, exif=exif)
+    return buffer.getvalue()
+
+
+class FoodgramTestCase(APITestCase):
+    """Общие данные тестов API; файлы пишутся во временный MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user('user')
+        cls.author = cls.create_user('author')
+        cls.tags = [
+            Tag.objects.create(name=name, slug=slug, color=color)
+            for name, slug, color in (
+                ('Завтрак', 'breakfast', '#E26C2D'),
+                ('Обед', 'lunch', '#49B64E'),
+            )
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (
+                ('Мука', 'г'), ('Молоко', 'мл'), ('Яйцо', 'шт'),
+            )
+        ]
+
+    def setUp(self):
+        # Версии данных откатываются после каждого теста, и кэши
+        # процесса иначе отдали бы данные прошлого теста.
+        clear_caches()
+
+    @staticmethod
+    def create_user(username, **kwargs):
+        return User.objects.create_user(
+            username=username, email=f'{username}@foodgram.local',
+            first_name=username.title(), last_name='Test',
+            password='test-password', **kwargs
+        )
+
+    @classmethod
+    def create_recipe(cls, author=None, amounts=((0, 100), (1, 200)),
+                      tags=(0,), **kwargs):
+        """Рецепт с ингредиентами cls.ingredients[i] в количестве amount
+        для каждой пары (i, amount)."""
+        recipe = Recipe.objects.create(
+            author=author or cls.author,
+            name=kwargs.pop('name', 'Блины'),
+            image=ContentFile(make_image(), name='recipe.png'),
+            text=kwargs.pop('text', 'Смешать и пожарить.'),
+            cooking_time=kwargs.pop('cooking_time', 30),
+            **kwargs
+        )
+        recipe.tags.set([cls.tags[index] for index in tags])
+        for index, amount in amounts:
+            IngredientAmount.objects.create(
+                recipe=recipe, ingredient=cls.ingredients[index],
+                amount=amount
+            )
+        return recipe
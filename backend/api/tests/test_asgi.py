@@ -0,0 +1,82 @@
+import asyncio
+
+from django.test import AsyncClient, TransactionTestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from api.caches import clear_caches
+from foodgram.handlers import StreamingASGIHandler
+from recipes.models import Ingredient, ShoppingListItem
+from users.models import User
+
+
+class AsgiTest(TransactionTestCase):
+    """Запросы через ASGI: представления выполняются в пуле потоков,
+    а список покупок отдается потоком по частям."""
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(
+            username='user', email='user@foodgram.local',
+            first_name='User', last_name='Test', password='test-password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        for name, unit, amount in (
+            ('Яйцо', 'шт', 3), ('Мука', 'г', 100), ('Молоко', 'мл', 200),
+        ):
+            ShoppingListItem.objects.create(
+                user=self.user, amount=amount,
+                ingredient=Ingredient.objects.create(
+                    name=name, measurement_unit=unit
+                ),
+            )
+
+    async def test_view_runs_outside_event_loop(self):
+        client = AsyncClient()
+        # AsyncClient передает дополнительные аргументы как заголовки ASGI.
+        response = await client.get(
+            reverse('users:users-me'), authorization=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'user')
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+    def request(self, path):
+        """Ответ ASGI-приложения: статус, заголовки и части тела."""
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': b'', 'root_path': '', 'scheme': 'http',
+            'server': ('testserver', 80),
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Token {self.token.key}'.encode()),
+            ],
+        }
+        asyncio.run(StreamingASGIHandler()(scope, receive, send))
+        start, *body = messages
+        return start, [message.get('body', b'') for message in body]
+
+    def test_shopping_list_is_streamed(self):
+        start, parts = self.request(
+            reverse('api:recipe-download-shopping-cart')
+        )
+        self.assertEqual(start['status'], 200)
+        self.assertEqual(
+            dict(start['headers'])[b'Content-Disposition'],
+            b'attachment; filename=shopping_list.txt'
+        )
+        # Заголовок, три строки и закрывающее пустое сообщение.
+        self.assertEqual(len(parts), 5)
+        self.assertEqual(
+            b''.join(parts).decode(),
+            'Список покупок\n\n'
+            'Молоко (мл) - 200\nМука (г) - 100\nЯйцо (шт) - 3'
+        )
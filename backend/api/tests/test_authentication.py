@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from api.tests.base import FoodgramTestCase
+from users.authentication import TokenCache, token_cache
+
+
+class TokenCacheTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.me = reverse('users:users-me')
+
+    def test_repeated_requests_skip_token_query(self):
+        self.assertEqual(self.client.get(self.me).status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.me).status_code, 200)
+
+    def test_logout_revokes_cached_token(self):
+        self.client.get(self.me)
+        response = self.client.post(reverse('users:logout'))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(self.me).status_code, 401)
+
+    def test_user_changes_evict_cached_user(self):
+        self.client.get(self.me)
+        self.user.first_name = 'Иван'
+        self.user.save()
+        self.assertEqual(self.client.get(self.me).json()['first_name'], 'Иван')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.me).status_code, 401)
+
+    def test_entries_expire_after_ttl(self):
+        cache = TokenCache(max_size=10, ttl=5)
+        with mock.patch('users.authentication.time.monotonic') as monotonic:
+            monotonic.return_value = 100
+            cache.set(self.token.key, self.user, self.token)
+            monotonic.return_value = 104
+            self.assertIsNotNone(cache.get(self.token.key))
+            monotonic.return_value = 106
+            self.assertIsNone(cache.get(self.token.key))
+
+    def test_zero_ttl_disables_cache(self):
+        cache = TokenCache(max_size=10, ttl=0)
+        cache.set(self.token.key, self.user, self.token)
+        self.assertIsNone(cache.get(self.token.key))
@@ -0,0 +1,150 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api import bulk
+from api.tests.base import FoodgramTestCase
+from recipes.counters import recount_counters
+from recipes.models import FavoriteRecipe, FeedEntry, Recipe, ShoppingCart
+from recipes.shopping_lists import rebuild_shopping_lists
+from recipes.versions import bump_versions, user_scope
+from users.models import Subscription, User
+
+MISSING_ID = 10 ** 6
+
+
+class BulkTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipes = [self.create_recipe() for _ in range(4)]
+        self.ids = [recipe.pk for recipe in self.recipes]
+        self.favorites = reverse('api:recipe-favorite-bulk')
+        self.subscriptions = reverse('users:users-subscribe-bulk')
+        self.client.force_authenticate(self.user)
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(item['id'], item['status']) for item in response.json()]
+
+    def assert_counters_consistent(self):
+        counters = list(Recipe.objects.order_by('pk').values_list(
+            'favorites_count', flat=True
+        )) + list(User.objects.order_by('pk').values_list(
+            'followers_count', flat=True
+        ))
+        recount_counters()
+        self.assertEqual(
+            list(Recipe.objects.order_by('pk').values_list(
+                'favorites_count', flat=True
+            )) + list(User.objects.order_by('pk').values_list(
+                'followers_count', flat=True
+            )),
+            counters
+        )
+
+    def test_favorite_results(self):
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipes[1])
+        response = self.client.post(self.favorites, {
+            'ids': [self.ids[0], self.ids[1], MISSING_ID, self.ids[0]]
+        }, format='json')
+        self.assertEqual(self.statuses(response), [
+            (self.ids[0], 'added'),
+            (self.ids[1], 'exists'),
+            (MISSING_ID, 'not_found'),
+        ])
+        response = self.client.delete(self.favorites, {
+            'ids': [self.ids[1], self.ids[2], MISSING_ID]
+        }, format='json')
+        self.assertEqual(self.statuses(response), [
+            (self.ids[1], 'removed'),
+            (self.ids[2], 'absent'),
+            (MISSING_ID, 'not_found'),
+        ])
+        self.assertEqual(
+            list(FavoriteRecipe.objects.filter(
+                user=self.user
+            ).values_list('recipe_id', flat=True)),
+            [self.ids[0]]
+        )
+        self.assert_counters_consistent()
+
+    def test_rows_inserted_concurrently_are_not_counted(self):
+        # Строки появились между проверкой и INSERT: их записал
+        # параллельный запрос, а проверка вернула устаревший ответ.
+        stale = {pk: False for pk in self.ids[:2]}
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipes[0])
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+        Subscription.objects.create(subscriber=self.user, author=self.author)
+        with mock.patch.object(bulk, 'check_recipes', return_value=stale):
+            for model in (FavoriteRecipe, ShoppingCart):
+                self.assertEqual(
+                    bulk.add_recipes(self.user, model, self.ids[:2]),
+                    [
+                        {'id': self.ids[0], 'status': bulk.EXISTS},
+                        {'id': self.ids[1], 'status': bulk.ADDED},
+                    ]
+                )
+        other = self.create_user('other')
+        with mock.patch.object(bulk, 'check_authors', return_value={
+            self.author.pk: False, other.pk: False
+        }):
+            self.assertEqual(
+                bulk.subscribe(self.user, [self.author.pk, other.pk]),
+                [
+                    {'id': self.author.pk, 'status': bulk.EXISTS},
+                    {'id': other.pk, 'status': bulk.ADDED},
+                ]
+            )
+        self.assert_counters_consistent()
+        self.assertEqual(rebuild_shopping_lists(), 0)
+
+    def count_queries(self, method, url, ids):
+        with CaptureQueriesContext(connection) as context:
+            self.statuses(method(url, {'ids': ids}, format='json'))
+        return len(context)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        # Первое изменение создает строку версии пользователя.
+        bump_versions(user_scope(self.user.pk))
+        post, delete = self.client.post, self.client.delete
+        self.assertEqual(
+            self.count_queries(post, self.favorites, self.ids[:1]),
+            self.count_queries(post, self.favorites, self.ids[1:])
+        )
+        self.assertEqual(
+            self.count_queries(delete, self.favorites, self.ids[:1]),
+            self.count_queries(delete, self.favorites, self.ids[1:])
+        )
+
+    def test_subscribe_results(self):
+        other = self.create_user('other')
+        response = self.client.post(self.subscriptions, {
+            'ids': [self.author.pk, self.user.pk, other.pk, MISSING_ID]
+        }, format='json')
+        self.assertEqual(self.statuses(response), [
+            (self.author.pk, 'added'),
+            (self.user.pk, 'self'),
+            (other.pk, 'added'),
+            (MISSING_ID, 'not_found'),
+        ])
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.user).count(), 4
+        )
+        response = self.client.delete(self.subscriptions, {
+            'ids': [self.author.pk, self.user.pk]
+        }, format='json')
+        self.assertEqual(self.statuses(response), [
+            (self.author.pk, 'removed'),
+            (self.user.pk, 'absent'),
+        ])
+        self.assertEqual(
+            list(Subscription.objects.filter(
+                subscriber=self.user
+            ).values_list('author_id', flat=True)),
+            [other.pk]
+        )
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+        self.assert_counters_consistent()
@@ -0,0 +1,165 @@
+from django.urls import reverse
+
+from api.caches import clear_caches
+from api.tests.base import FoodgramTestCase
+from recipes.models import FavoriteRecipe, Ingredient, Tag
+from recipes.versions import RECIPES_SCOPE, get_versions
+from users.models import Subscription
+
+
+class ConditionalGetTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe()
+        self.list_url = reverse('api:recipe-list')
+        self.detail_url = reverse('api:recipe-detail', args=(self.recipe.pk,))
+
+    def assert_not_modified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def assert_modified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_not_modified_without_serializing(self):
+        for url, queries in (
+            # COUNT, страница и версии.
+            (self.list_url, 3),
+            # Рецепт и версии.
+            (self.detail_url, 2),
+            # Только версии.
+            (reverse('api:tag-list'), 1),
+            (reverse('api:ingredient-list'), 1),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Last-Modified', response)
+                clear_caches()
+                with self.assertNumQueries(queries):
+                    self.assert_not_modified(url, response['ETag'])
+
+    def test_recipe_change(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.recipe.name = 'Оладьи'
+        self.recipe.save()
+        response = self.assert_modified(self.detail_url, etag)
+        self.assertEqual(response.data['name'], 'Оладьи')
+        self.assertEqual(
+            self.client.get(self.list_url).data['results'][0]['name'],
+            'Оладьи'
+        )
+
+    def test_recipe_change_keeps_other_pages(self):
+        self.create_recipe(name='Оладьи')
+        first, second = (
+            self.client.get(self.list_url, {'limit': 1, 'page': page})
+            for page in (1, 2)
+        )
+        global_version = get_versions([RECIPES_SCOPE])[RECIPES_SCOPE]
+        self.recipe.name = 'Сырники'
+        self.recipe.save()
+        self.assertEqual(
+            get_versions([RECIPES_SCOPE])[RECIPES_SCOPE], global_version
+        )
+        self.assert_not_modified(
+            f'{self.list_url}?limit=1&page=1', first['ETag']
+        )
+        response = self.assert_modified(
+            f'{self.list_url}?limit=1&page=2', second['ETag']
+        )
+        self.assertEqual(response.data['results'][0]['name'], 'Сырники')
+
+    def test_new_and_deleted_recipes(self):
+        etag = self.client.get(self.list_url)['ETag']
+        recipe = self.create_recipe(name='Оладьи')
+        etag = self.assert_modified(self.list_url, etag)['ETag']
+        recipe.delete()
+        self.assert_modified(self.list_url, etag)
+
+    def test_filtered_count_change(self):
+        # Рецепт попадает под фильтр на второй странице: первая
+        # страница та же, но меняется число рецептов.
+        newer = self.create_recipe(tags=(1,))
+        url = f'{self.list_url}?tags=lunch&limit=1'
+        etag = self.client.get(url)['ETag']
+        self.recipe.tags.add(self.tags[1])
+        response = self.assert_modified(url, etag)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['results'][0]['id'], newer.pk)
+
+    def test_feed_follows_recipe_changes(self):
+        Subscription.objects.create(subscriber=self.user, author=self.author)
+        self.client.force_authenticate(self.user)
+        url = reverse('api:recipe-feed')
+        etag = self.client.get(url)['ETag']
+        self.assert_not_modified(url, etag)
+        self.recipe.name = 'Оладьи'
+        self.recipe.save()
+        response = self.assert_modified(url, etag)
+        self.assertEqual(response.data['results'][0]['name'], 'Оладьи')
+
+    def test_recipe_ingredients_change(self):
+        self.client.get(self.detail_url)
+        self.recipe.ingredientamounts.filter(
+            ingredient=self.ingredients[0]
+        ).update(amount=1)
+        amount = self.recipe.ingredientamounts.get(
+            ingredient=self.ingredients[1]
+        )
+        amount.amount = 5
+        amount.save()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(
+            {item['id']: item['amount']
+             for item in response.data['ingredients']}[amount.ingredient_id],
+            5
+        )
+
+    def test_author_rename(self):
+        list_etag = self.client.get(self.list_url)['ETag']
+        self.author.username = 'chef'
+        self.author.save()
+        response = self.assert_modified(self.detail_url, '"stale"')
+        self.assertEqual(response.data['author']['username'], 'chef')
+        self.assert_modified(self.list_url, list_etag)
+
+    def test_user_saves_keep_recipe_etags(self):
+        etag = self.client.get(self.list_url)['ETag']
+        self.author.set_password('new-password')
+        self.author.save()
+        self.user.first_name = 'Другой'
+        self.user.save()
+        self.create_user('newcomer')
+        self.assert_not_modified(self.list_url, etag)
+
+    def test_user_flags(self):
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.detail_url)['ETag']
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipe)
+        response = self.assert_modified(self.detail_url, etag)
+        self.assertTrue(response.data['is_favorited'])
+        self.client.force_authenticate(self.author)
+        self.assertFalse(self.client.get(self.detail_url).data['is_favorited'])
+
+    def test_tag_list(self):
+        url = reverse('api:tag-list')
+        etag = self.client.get(url)['ETag']
+        Tag.objects.create(name='Ужин', slug='dinner', color='#8775D2')
+        response = self.assert_modified(url, etag)
+        self.assertIn('dinner', [tag['slug'] for tag in response.json()])
+
+    def test_ingredient_search(self):
+        url = reverse('api:ingredient-list')
+        self.assertEqual(len(self.client.get(url, {'name': 'мо'}).json()), 1)
+        Ingredient.objects.create(name='Морковь', measurement_unit='г')
+        self.assertEqual(
+            [item['name'] for item in self.client.get(
+                url, {'name': 'мо'}
+            ).json()],
+            ['Молоко', 'Морковь']
+        )
@@ -0,0 +1,65 @@
+from django.urls import reverse
+
+from api.tests.base import FoodgramTestCase
+from recipes.counters import recount_counters
+from recipes.models import FavoriteRecipe, Recipe
+from users.models import Subscription, User
+
+
+class CountersTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe()
+        self.client.force_authenticate(self.user)
+
+    def counters(self):
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        return (
+            self.recipe.favorites_count,
+            self.author.recipes_count,
+            self.author.followers_count,
+        )
+
+    def assert_consistent(self):
+        before = self.counters()
+        recount_counters()
+        self.assertEqual(self.counters(), before)
+
+    def test_favorite_and_subscription(self):
+        favorite = reverse('api:recipe-favorite', args=(self.recipe.pk,))
+        subscribe = reverse('users:users-subscribe', args=(self.author.pk,))
+        self.client.post(favorite)
+        self.client.post(subscribe)
+        self.assertEqual(self.counters(), (1, 1, 1))
+        self.assert_consistent()
+        self.client.delete(favorite)
+        self.client.delete(subscribe)
+        self.assertEqual(self.counters(), (0, 1, 0))
+        self.assert_consistent()
+
+    def test_recipe_delete(self):
+        self.create_recipe()
+        self.assertEqual(self.counters()[1], 2)
+        self.recipe.delete()
+        self.assertEqual(User.objects.get(pk=self.author.pk).recipes_count, 1)
+
+    def test_drifted_counter_stays_non_negative(self):
+        # bulk_create не отправляет сигналы, и счетчик остается нулем.
+        Subscription.objects.bulk_create(
+            [Subscription(subscriber=self.user, author=self.author)]
+        )
+        FavoriteRecipe.objects.bulk_create(
+            [FavoriteRecipe(user=self.user, recipe=self.recipe)]
+        )
+        response = self.client.delete(
+            reverse('users:users-subscribe', args=(self.author.pk,))
+        )
+        self.assertEqual(response.status_code, 204)
+        response = self.client.delete(
+            reverse('api:recipe-favorite', args=(self.recipe.pk,))
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counters(), (0, 1, 0))
+        self.assertFalse(Recipe.objects.filter(favorites_count__lt=0))
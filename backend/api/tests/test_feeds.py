@@ -0,0 +1,114 @@
+from django.test import override_settings
+from django.urls import reverse
+
+from api.tests.base import FoodgramTestCase
+from recipes.feeds import rebuild_feeds
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+
+class FeedTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = self.create_user('other')
+        self.fan = self.create_user('fan')
+        self.url = reverse('api:recipe-feed')
+        self.client.force_authenticate(self.user)
+
+    def subscribe(self, author, *subscribers):
+        for subscriber in subscribers or (self.user,):
+            Subscription.objects.create(subscriber=subscriber, author=author)
+
+    def expected_ids(self):
+        return list(Recipe.objects.filter(
+            author__authors__subscriber=self.user
+        ).order_by('-pub_date', '-id').values_list('pk', flat=True))
+
+    def read_feed(self, limit=4):
+        """id рецептов всех страниц по ссылкам next и ответы страниц."""
+        pages = []
+        url = f'{self.url}?limit={limit}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            url = pages[-1]['next']
+        ids = [
+            recipe['id'] for page in pages for recipe in page['results']
+        ]
+        return ids, pages
+
+    def page_ids(self, page):
+        return [recipe['id'] for recipe in page['results']]
+
+    def test_pages_match_join(self):
+        self.subscribe(self.author)
+        self.subscribe(self.other)
+        for number in range(5):
+            self.create_recipe(name=f'Рецепт {number}')
+            self.create_recipe(author=self.other)
+        self.create_recipe(author=self.fan)
+        ids, pages = self.read_feed()
+        self.assertEqual(ids, self.expected_ids())
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous'])
+        previous = self.client.get(pages[1]['previous']).json()
+        self.assertEqual(self.page_ids(previous), self.page_ids(pages[0]))
+
+    def test_unsubscribe_removes_author(self):
+        self.subscribe(self.author)
+        self.subscribe(self.other)
+        self.create_recipe()
+        self.create_recipe(author=self.other)
+        Subscription.objects.get(
+            subscriber=self.user, author=self.other
+        ).delete()
+        ids, _ = self.read_feed()
+        self.assertEqual(ids, self.expected_ids())
+        self.assertEqual(len(ids), 1)
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_popular_authors_are_merged_on_read(self):
+        self.create_recipe()
+        self.subscribe(self.author)
+        self.subscribe(self.other)
+        self.subscribe(self.author, self.fan)
+        self.create_recipe()
+        for _ in range(3):
+            self.create_recipe(author=self.other)
+        self.assertEqual(
+            FeedEntry.objects.filter(
+                user=self.user, author=self.author
+            ).count(),
+            1
+        )
+        ids, _ = self.read_feed(limit=2)
+        self.assertEqual(ids, self.expected_ids())
+        self.assertEqual(len(ids), 5)
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_author_is_backfilled_after_losing_followers(self):
+        self.subscribe(self.author, self.user, self.fan)
+        popular_recipe = self.create_recipe()
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+        Subscription.objects.get(subscriber=self.fan).delete()
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.user, recipe=popular_recipe
+        ).exists())
+        self.assertEqual(rebuild_feeds(), (0, 0))
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_bulk_unsubscribe_backfills_author(self):
+        self.subscribe(self.author, self.user, self.fan)
+        popular_recipe = self.create_recipe()
+        self.client.force_authenticate(self.fan)
+        response = self.client.delete(
+            reverse('users:users-subscribe-bulk'),
+            {'ids': [self.author.pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.user, recipe=popular_recipe
+        ).exists())
+        self.assertEqual(rebuild_feeds(), (0, 0))
@@ -0,0 +1,142 @@
+import base64
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image
+
+from api.tests.base import FoodgramTestCase, make_image
+from recipes import images
+from recipes.management.commands.seed import SEED_IMAGE, save_seed_image
+from recipes.models import Recipe
+
+EXIF_ORIENTATION = 0x0112
+ROTATED_90 = 6
+
+
+def exif_with_rotation():
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = ROTATED_90
+    return exif.tobytes()
+
+
+class NormalizeImageTest(FoodgramTestCase):
+
+    def test_strips_exif_and_limits_dimensions(self):
+        data = make_image(
+            (3200, 1000), 'JPEG', exif=exif_with_rotation()
+        )
+        normalized = images.normalize_image(
+            ContentFile(data, name='photo.jpeg')
+        )
+        image = Image.open(BytesIO(normalized.read()))
+        self.assertEqual(normalized.name, 'photo.jpg')
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (500, 1600))
+        self.assertFalse(image.getexif())
+
+    def test_keeps_transparency_in_png(self):
+        normalized = images.normalize_image(ContentFile(
+            make_image(mode='RGBA'), name='icon.png'
+        ))
+        image = Image.open(BytesIO(normalized.read()))
+        self.assertEqual((image.format, image.mode), ('PNG', 'RGBA'))
+
+    def test_upload_stores_normalized_original(self):
+        self.client.force_authenticate(self.author)
+        data = make_image((2000, 100), 'JPEG', exif=exif_with_rotation())
+        response = self.client.post(reverse('api:recipe-list'), {
+            'ingredients': [{'id': self.ingredients[0].pk, 'amount': 10}],
+            'tags': [self.tags[0].pk],
+            'image': 'data:image/jpeg;base64,'
+                     + base64.b64encode(data).decode(),
+            'name': 'Оладьи',
+            'text': 'Пожарить.',
+            'cooking_time': 20,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertTrue(recipe.image.name.endswith('.jpg'))
+        with recipe.image.open('rb') as file:
+            image = Image.open(file)
+            self.assertEqual(image.size, (80, 1600))
+            self.assertFalse(image.getexif())
+
+
+class ProcessRecipeImageTest(FoodgramTestCase):
+
+    def test_rebuild_deletes_previous_variants(self):
+        recipe = self.create_recipe()
+        images.process_recipe_image(recipe.pk)
+        recipe.refresh_from_db()
+        old_variants = (recipe.image_webp.name, recipe.image_thumbnail.name)
+        images.process_recipe_image(recipe.pk)
+        recipe.refresh_from_db()
+        for name in old_variants:
+            self.assertFalse(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(recipe.image_webp.name))
+        self.assertTrue(default_storage.exists(recipe.image_thumbnail.name))
+
+    def test_replacing_image_deletes_variants(self):
+        recipe = self.create_recipe()
+        images.process_recipe_image(recipe.pk)
+        recipe.refresh_from_db()
+        old_variants = (recipe.image_webp.name, recipe.image_thumbnail.name)
+        self.client.force_authenticate(self.author)
+        with mock.patch(
+            'api.serializers.schedule_image_processing'
+        ) as schedule, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('api:recipe-detail', args=(recipe.pk,)), {
+                    'ingredients': [
+                        {'id': self.ingredients[0].pk, 'amount': 10}
+                    ],
+                    'tags': [self.tags[0].pk],
+                    'image': 'data:image/png;base64,'
+                             + base64.b64encode(make_image()).decode(),
+                    'name': 'Блины',
+                    'text': 'Пожарить.',
+                    'cooking_time': 20,
+                }, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        schedule.assert_called_once_with(recipe.pk)
+        for name in old_variants:
+            self.assertFalse(default_storage.exists(name))
+
+    def test_processed_variants_replace_cached_body(self):
+        recipe = self.create_recipe()
+        url = reverse('api:recipe-detail', args=(recipe.pk,))
+        before = self.client.get(url).json()
+        self.assertTrue(before['image'].endswith('.png'))
+        images.process_recipe_image(recipe.pk)
+        after = self.client.get(url).json()
+        self.assertTrue(after['image'].endswith('.webp'))
+        self.assertTrue(after['thumbnail'].endswith('_thumbnail.webp'))
+
+    def test_seed_image_can_be_processed(self):
+        save_seed_image()
+        recipe = self.create_recipe()
+        Recipe.objects.filter(pk=recipe.pk).update(image=SEED_IMAGE)
+        images.process_recipe_image(recipe.pk)
+        recipe.refresh_from_db()
+        self.assertTrue(default_storage.exists(recipe.image_webp.name))
+
+    def test_skips_missing_source(self):
+        recipe = self.create_recipe()
+        default_storage.delete(recipe.image.name)
+        with self.assertLogs('recipes.images', 'WARNING'):
+            images.process_recipe_image(recipe.pk)
+        recipe.refresh_from_db()
+        self.assertFalse(recipe.image_webp)
+
+    def test_background_errors_are_logged(self):
+        with mock.patch.object(
+            images, 'process_recipe_image', side_effect=OSError('broken')
+        ), mock.patch.object(images, 'connection'), self.assertLogs(
+            'recipes.images', 'ERROR'
+        ) as logs:
+            images.run_in_background(1)
+        self.assertIn('recipe 1', logs.output[0])
@@ -0,0 +1,59 @@
+import io
+
+from api.tests.base import FoodgramTestCase
+from recipes.importers import CATALOGS, CatalogImporter, iter_json
+from recipes.models import Ingredient, Tag
+
+
+class CatalogImporterTest(FoodgramTestCase):
+
+    def run_import(self, catalog, rows, **kwargs):
+        return CatalogImporter(CATALOGS[catalog], **kwargs).run(rows)
+
+    def test_counts_inserted_rows(self):
+        result = self.run_import('ingredients', [
+            {'name': 'Мука', 'measurement_unit': 'г'},
+            {'name': 'Мука', 'measurement_unit': 'кг'},
+            {'name': 'Соль', 'measurement_unit': 'г'},
+            {'name': 'Соль', 'measurement_unit': 'г'},
+            {'name': '', 'measurement_unit': 'г'},
+        ])
+        self.assertEqual(
+            (result.read, result.inserted, result.unchanged, result.invalid),
+            (5, 2, 2, 1)
+        )
+        self.assertTrue(Ingredient.objects.filter(
+            name='Соль', measurement_unit='г'
+        ).exists())
+
+    def test_repeated_import_inserts_nothing(self):
+        rows = [{'name': 'Соль', 'measurement_unit': 'г'}]
+        self.run_import('ingredients', rows)
+        result = self.run_import('ingredients', rows)
+        self.assertEqual((result.inserted, result.unchanged), (0, 1))
+
+    def test_update_reports_unique_conflicts(self):
+        result = self.run_import('tags', [
+            # Слаг новый, но название занято тэгом lunch.
+            {'name': 'Обед', 'color': '#00FF00', 'slug': 'dinner'},
+            {'name': 'Утро', 'color': '#0000FF', 'slug': 'breakfast'},
+            {'name': 'Ужин', 'color': '#000000', 'slug': 'supper'},
+            {'name': 'Ужин', 'color': '#FFFFFF', 'slug': 'late'},
+        ], update=True)
+        self.assertEqual(
+            (result.inserted, result.updated, result.invalid), (1, 1, 2)
+        )
+        self.assertFalse(Tag.objects.filter(slug='dinner').exists())
+        self.assertEqual(
+            Tag.objects.get(slug='breakfast').name, 'Утро'
+        )
+        self.assertEqual(Tag.objects.get(name='Ужин').slug, 'supper')
+
+    def test_json_items_that_are_not_objects_are_invalid(self):
+        rows = iter_json(io.StringIO(
+            '[{"name": "Соль", "measurement_unit": "г"}, "Перец", 1, []]'
+        ))
+        result = self.run_import('ingredients', rows)
+        self.assertEqual(
+            (result.read, result.inserted, result.invalid), (4, 1, 3)
+        )
@@ -0,0 +1,60 @@
+from django.urls import reverse
+
+from api.tests.base import FoodgramTestCase
+from recipes.ingredient_index import IngredientPrefixIndex
+from recipes.models import Ingredient
+
+
+class IngredientPrefixIndexTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for name, unit in (
+            ('молоко кокосовое', 'мл'), ('МОРКОВЬ', 'г'), ('Ёрш', 'г'),
+            ('ёжевика', 'г'), ('Маш', 'г'),
+        ):
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+        self.index = IngredientPrefixIndex()
+
+    def names(self, prefix, version=1):
+        return [
+            ingredient['name']
+            for ingredient in self.index.search(prefix, version)
+        ]
+
+    def test_case_folded_cyrillic_prefixes(self):
+        for prefix in ('мо', 'МО', 'Мо', 'мО'):
+            with self.subTest(prefix=prefix):
+                self.assertEqual(
+                    self.names(prefix),
+                    ['Молоко', 'молоко кокосовое', 'МОРКОВЬ']
+                )
+        self.assertEqual(self.names('ЁЖ'), ['ёжевика'])
+        self.assertEqual(self.names('ё'), ['ёжевика', 'Ёрш'])
+        self.assertEqual(self.names('молоко '), ['молоко кокосовое'])
+        self.assertEqual(self.names('ма'), ['Маш'])
+        self.assertEqual(self.names('мя'), [])
+
+    def test_rebuilt_when_version_changes(self):
+        self.assertEqual(self.names('ма'), ['Маш'])
+        Ingredient.objects.create(name='Мак', measurement_unit='г')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('ма'), ['Маш'])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names('ма', version=2), ['Мак', 'Маш'])
+
+    def test_api_search_follows_ingredient_changes(self):
+        url = reverse('api:ingredient-list')
+        self.assertEqual(
+            [item['name'] for item in self.client.get(
+                url, {'name': 'МУ'}
+            ).json()],
+            ['Мука']
+        )
+        Ingredient.objects.create(name='мука ржаная', measurement_unit='г')
+        self.assertEqual(
+            [item['name'] for item in self.client.get(
+                url, {'name': 'МУ'}
+            ).json()],
+            ['Мука', 'мука ржаная']
+        )
@@ -0,0 +1,33 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+
+from api.tests.base import FoodgramTestCase
+
+
+class RequestMetricsCommandTest(FoodgramTestCase):
+
+    def test_url_is_required(self):
+        # Гистограммы самой команды всегда пусты.
+        with self.assertRaisesMessage(CommandError, '--url'):
+            call_command('request_metrics')
+
+    def test_reads_server_metrics(self):
+        admin = self.create_user('admin', is_staff=True)
+        self.client.force_authenticate(admin)
+        self.client.get(reverse('api:tag-list'))
+        metrics = self.client.get(reverse('api:request-metrics')).json()
+        response = mock.Mock(json=mock.Mock(return_value=metrics))
+        stdout = StringIO()
+        with mock.patch('requests.get', return_value=response) as get:
+            call_command(
+                'request_metrics', url='http://foodgram.local/',
+                token='secret', stdout=stdout
+            )
+        get.assert_called_once_with(
+            'http://foodgram.local/api/metrics/requests/',
+            headers={'Authorization': 'Token secret'}
+        )
+        self.assertIn('TagViewSet.list', stdout.getvalue())
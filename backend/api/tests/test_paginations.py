@@ -0,0 +1,141 @@
+from base64 import b64encode
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.urls import reverse
+from django.utils import timezone
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import Recipe
+from users.models import Subscription
+
+
+def make_cursor(position):
+    return b64encode(urlencode({'p': position}).encode()).decode()
+
+
+BAD_CURSORS = (
+    'не-base64',
+    make_cursor('вчера|1'),
+    make_cursor(f'{timezone.now().isoformat()}|id'),
+    make_cursor('1'),
+)
+
+
+class CursorPaginationTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = self.create_user('other')
+        self.url = reverse('api:recipe-list')
+        now = timezone.now()
+        for number in range(7):
+            recipe = self.create_recipe(
+                author=self.other if number % 2 else self.author,
+                name=f'Суп {number}' if number % 3 else f'Блины {number}',
+                tags=(number % 2,),
+            )
+            # Два рецепта с одной датой: порядок решает id.
+            Recipe.objects.filter(pk=recipe.pk).update(
+                pub_date=now - timedelta(minutes=number // 2 * 2)
+            )
+
+    def expected_ids(self, **filters):
+        return list(Recipe.objects.filter(**filters).order_by(
+            '-pub_date', '-id'
+        ).values_list('pk', flat=True))
+
+    def read_pages(self, **params):
+        """Все страницы по ссылкам next, начиная с первой."""
+        pages = []
+        url, data = self.url, {'pagination': 'cursor', **params}
+        while url:
+            response = self.client.get(url, data)
+            self.assertEqual(response.status_code, 200, response.content)
+            pages.append(response.json())
+            url, data = pages[-1]['next'], None
+        return pages
+
+    def page_ids(self, page):
+        return [recipe['id'] for recipe in page['results']]
+
+    def test_next_and_previous_links(self):
+        pages = self.read_pages(limit=3)
+        self.assertEqual(
+            [pk for page in pages for pk in self.page_ids(page)],
+            self.expected_ids()
+        )
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        self.assertNotIn('count', pages[0])
+        self.assertIsNone(pages[0]['previous'])
+        for number in (2, 1):
+            previous = self.client.get(pages[number]['previous']).json()
+            self.assertEqual(
+                self.page_ids(previous), self.page_ids(pages[number - 1])
+            )
+        first = self.client.get(pages[1]['previous']).json()
+        self.assertIsNone(first['previous'])
+        self.assertEqual(first['next'], pages[0]['next'])
+
+    def test_new_recipes_do_not_shift_pages(self):
+        first = self.client.get(f'{self.url}?pagination=cursor&limit=3')
+        second = self.client.get(first.json()['next']).json()
+        self.create_recipe()
+        self.assertEqual(
+            self.page_ids(self.client.get(first.json()['next']).json()),
+            self.page_ids(second)
+        )
+
+    def test_bad_cursor(self):
+        for cursor in BAD_CURSORS:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_filters(self):
+        pages = self.read_pages(limit=2, author=self.other.pk, tags='lunch')
+        self.assertEqual(
+            [pk for page in pages for pk in self.page_ids(page)],
+            self.expected_ids(author=self.other, tags__slug='lunch')
+        )
+        self.assertEqual(len(pages), 2)
+        for page in pages:
+            for link in (page['next'], page['previous']):
+                if link:
+                    self.assertIn(f'author={self.other.pk}', link)
+                    self.assertIn('tags=lunch', link)
+
+    def test_search(self):
+        # С курсором найденные рецепты идут по дате, а не по релевантности.
+        pages = self.read_pages(limit=2, search='суп')
+        self.assertEqual(
+            [pk for page in pages for pk in self.page_ids(page)],
+            self.expected_ids(name__startswith='Суп')
+        )
+        self.assertEqual(len(pages), 2)
+
+
+class FeedCursorPaginationTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('api:recipe-feed')
+        Subscription.objects.create(subscriber=self.user, author=self.author)
+        for _ in range(3):
+            self.create_recipe()
+        self.client.force_authenticate(self.user)
+
+    def test_previous_link(self):
+        first = self.client.get(self.url, {'limit': 2}).json()
+        second = self.client.get(first['next']).json()
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            self.client.get(second['previous']).json()['results'],
+            first['results']
+        )
+
+    def test_bad_cursor(self):
+        for cursor in BAD_CURSORS:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
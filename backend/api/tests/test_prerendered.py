@@ -0,0 +1,53 @@
+from django.urls import reverse
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import Ingredient, Tag
+
+
+class PrerenderedListTest(FoodgramTestCase):
+
+    def get(self, url, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assert_cached(self, url):
+        """Повторный ответ те же байты, из базы читается только версия."""
+        response = self.get(url)
+        with self.assertNumQueries(1):
+            cached = self.get(url)
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        return response
+
+    def test_tag_list_follows_writes(self):
+        url = reverse('api:tag-list')
+        etag = self.assert_cached(url)['ETag']
+        tag = Tag.objects.create(name='Ужин', slug='dinner', color='#8775D2')
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            [item['slug'] for item in response.json()],
+            ['breakfast', 'lunch', 'dinner']
+        )
+        self.assert_cached(url)
+        tag.name = 'Поздний ужин'
+        tag.save()
+        self.assertIn(
+            'Поздний ужин', [item['name'] for item in self.get(url).json()]
+        )
+        tag.delete()
+        self.assertEqual(
+            [item['slug'] for item in self.get(url).json()],
+            ['breakfast', 'lunch']
+        )
+
+    def test_ingredient_list_follows_writes(self):
+        url = reverse('api:ingredient-list')
+        self.assert_cached(url)
+        Ingredient.objects.filter(name='Мука').delete()
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        self.assertEqual(
+            [item['name'] for item in self.assert_cached(url).json()],
+            ['Молоко', 'Соль', 'Яйцо']
+        )
@@ -0,0 +1,97 @@
+from django.urls import reverse
+
+from api.caches import clear_caches
+from api.tests.base import FoodgramTestCase
+from recipes.models import FavoriteRecipe, ShoppingCart
+from users.models import Subscription
+
+# COUNT, авторы страницы, последние рецепты всех авторов страницы.
+SUBSCRIPTIONS_QUERIES = 3
+
+# COUNT, рецепты страницы с флагами пользователя, версии для условного
+# GET и тел рецептов, затем для тел не из кэша рецепты, тэги
+# и ингредиенты.
+LIST_QUERIES = 6
+LIST_QUERIES_CACHED = 3
+# То же без COUNT.
+DETAIL_QUERIES = 5
+DETAIL_QUERIES_CACHED = 2
+
+
+class RecipeQueryCountTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipes = [
+            self.create_recipe(amounts=((0, 100), (1, 200), (2, 3)),
+                               tags=(0, 1))
+            for _ in range(6)
+        ]
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipes[0])
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[1])
+        Subscription.objects.create(subscriber=self.user, author=self.author)
+        self.client.force_authenticate(self.user)
+
+    def assert_queries(self, url, queries, cached_queries):
+        clear_caches()
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(cached_queries):
+            self.assertEqual(self.client.get(url).json(), response.json())
+        return response.json()
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        url = reverse('api:recipe-list')
+        for limit in (1, 6):
+            with self.subTest(limit=limit):
+                data = self.assert_queries(
+                    f'{url}?limit={limit}', LIST_QUERIES, LIST_QUERIES_CACHED
+                )
+                self.assertEqual(len(data['results']), limit)
+
+    def test_detail_queries(self):
+        for recipe in self.recipes[:2]:
+            with self.subTest(recipe=recipe.pk):
+                data = self.assert_queries(
+                    reverse('api:recipe-detail', args=(recipe.pk,)),
+                    DETAIL_QUERIES, DETAIL_QUERIES_CACHED
+                )
+                self.assertEqual(
+                    (data['is_favorited'], data['is_in_shopping_cart']),
+                    (recipe == self.recipes[0], recipe == self.recipes[1])
+                )
+                self.assertTrue(data['author']['is_subscribed'])
+                self.assertEqual(len(data['ingredients']), 3)
+
+
+class SubscriptionQueryCountTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        authors = [self.author] + [
+            self.create_user(f'author{index}') for index in range(3)
+        ]
+        for author in authors:
+            for _ in range(3):
+                self.create_recipe(author=author)
+            Subscription.objects.create(subscriber=self.user, author=author)
+        self.client.force_authenticate(self.user)
+
+    def test_queries_do_not_depend_on_page_size(self):
+        url = reverse('users:users-subscriptions')
+        for query, authors, recipes in (
+            ('limit=1', 1, 3),
+            ('limit=4', 4, 3),
+            ('limit=4&recipes_limit=2', 4, 2),
+        ):
+            with self.subTest(query=query):
+                with self.assertNumQueries(SUBSCRIPTIONS_QUERIES):
+                    response = self.client.get(f'{url}?{query}')
+                self.assertEqual(response.status_code, 200)
+                results = response.json()['results']
+                self.assertEqual(len(results), authors)
+                for author in results:
+                    self.assertEqual(len(author['recipes']), recipes)
+                    self.assertEqual(author['recipes_count'], 3)
+                    self.assertTrue(author['is_subscribed'])
@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+from django.db import connection, transaction
+from django.urls import reverse
+
+from api.filters import RecipeFilter
+from api.tests.base import FoodgramTestCase
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+
+PAGE_SIZE = 6
+
+
+def get_indexes(table, columns):
+    """Индексы таблицы, начинающиеся с одного из столбцов."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # Индексы UNIQUE-ограничений SQLite называет
+            # sqlite_autoindex_*, интроспекция Django их не видит.
+            cursor.execute(f'PRAGMA index_list({table})')
+            indexes = {}
+            for row in cursor.fetchall():
+                cursor.execute(f'PRAGMA index_info({row[1]})')
+                indexes[row[1]] = [column for *_, column in cursor.fetchall()]
+        else:
+            indexes = {
+                name: constraint['columns']
+                for name, constraint in connection.introspection
+                .get_constraints(cursor, table).items()
+                if constraint['index'] or constraint['unique']
+            }
+    return {
+        name for name, index_columns in indexes.items()
+        if index_columns and index_columns[0] in columns
+    }
+
+
+def explain(data, user):
+    queryset = RecipeFilter(
+        data,
+        queryset=Recipe.objects.all(),
+        request=SimpleNamespace(user=user),
+    ).qs[:PAGE_SIZE]
+    sql, params = queryset.query.sql_with_params()
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(
+            f'{connection.ops.explain_query_prefix()} {sql}', params
+        )
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+class RecipeFilterPlanTest(FoodgramTestCase):
+    """Каждый фильтр списка рецептов читает по индексу."""
+
+    def test_filters_use_indexes(self):
+        cases = (
+            ('author', {'author': self.author.pk}, Recipe, ('author_id',)),
+            ('tags', {'tags': [self.tags[0].slug]}, Recipe.tags.through,
+             ('recipe_id', 'tag_id')),
+            ('is_favorited', {'is_favorited': 'true'}, FavoriteRecipe,
+             ('user_id', 'recipe_id')),
+            ('is_in_shopping_cart', {'is_in_shopping_cart': 'true'},
+             ShoppingCart, ('user_id', 'recipe_id')),
+        )
+        for label, data, model, columns in cases:
+            with self.subTest(filter=label):
+                plan = explain(data, self.user)
+                indexes = get_indexes(model._meta.db_table, columns)
+                self.assertTrue(
+                    any(name in plan for name in indexes),
+                    f'{label} is not served by {sorted(indexes)}:\n{plan}'
+                )
+
+
+class RecipeFilterTest(FoodgramTestCase):
+
+    def filter(self, **params):
+        response = self.client.get(reverse('api:recipe-list'), params)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_author_is_exact(self):
+        # Поиск подстроки по author__id нашел бы оба рецепта.
+        author = self.create_user('author7', id=7001)
+        recipe = self.create_recipe(author)
+        self.create_recipe(self.create_user('author17', id=17001))
+        self.assertEqual(self.filter(author=author.pk), [recipe.pk])
+
+    def test_tags_match_any_without_duplicates(self):
+        both = self.create_recipe(tags=(0, 1))
+        second = self.create_recipe(tags=(1,))
+        self.create_recipe(tags=())
+        self.assertEqual(
+            self.filter(tags=[tag.slug for tag in self.tags]),
+            [second.pk, both.pk]
+        )
+
+    def test_favorited_and_cart(self):
+        favorite = self.create_recipe()
+        in_cart = self.create_recipe()
+        FavoriteRecipe.objects.create(user=self.user, recipe=favorite)
+        ShoppingCart.objects.create(user=self.user, recipe=in_cart)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.filter(is_favorited=1), [favorite.pk])
+        self.assertEqual(self.filter(is_in_shopping_cart=1), [in_cart.pk])
@@ -0,0 +1,129 @@
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITransactionTestCase
+
+from api.caches import clear_caches
+from foodgram.replicas import (
+    REPLICA_DB_ALIAS,
+    STICKY_COOKIE,
+    ReplicaRouter,
+    recent_writers,
+    use_replica
+)
+from recipes.models import DataVersion, FavoriteRecipe, Recipe, Tag
+from recipes.versions import TAGS_SCOPE, bump_versions
+from users.models import User
+
+
+@skipUnless(
+    connection.vendor == 'sqlite', 'the replica is copied by sync_replica'
+)
+@override_settings(READ_REPLICA_LAG_INTERVAL=0)
+class ReplicaTest(APITransactionTestCase):
+    """Основная база и реплика - два файла SQLite; реплику обновляет
+    sync_replica, как в локальной разработке."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Псевдоним добавляется после setUpClass: иначе тестовый класс
+        # запретил бы запросы к нему.
+        super().setUpClass()
+        cls.replica_dir = tempfile.mkdtemp()
+        name = str(Path(cls.replica_dir) / 'replica.sqlite3')
+        settings.DATABASES[REPLICA_DB_ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': name,
+            'TEST': {'NAME': name},
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA_DB_ALIAS].close()
+        del connections[REPLICA_DB_ALIAS]
+        del settings.DATABASES[REPLICA_DB_ALIAS]
+        shutil.rmtree(cls.replica_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        clear_caches()
+        recent_writers._until.clear()
+        self.user = User.objects.create_user(
+            username='user', email='user@foodgram.local',
+            first_name='User', last_name='Test', password='test-password'
+        )
+        Tag.objects.create(name='Завтрак', slug='breakfast', color='#E26C2D')
+        self.sync()
+        # Запись, которую реплика еще не получила.
+        Tag.objects.create(name='Обед', slug='lunch', color='#49B64E')
+        self.url = reverse('api:tag-list')
+
+    @staticmethod
+    def sync():
+        call_command('sync_replica', stdout=StringIO())
+
+    def tag_slugs(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [tag['slug'] for tag in response.json()]
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.tag_slugs(), ['breakfast'])
+        self.sync()
+        self.assertEqual(self.tag_slugs(), ['breakfast', 'lunch'])
+
+    def test_writes_go_to_primary_and_pin_the_user(self):
+        recipe = Recipe.objects.create(
+            author=self.user, name='Блины', image='recipes/recipe.png',
+            text='Пожарить.', cooking_time=10
+        )
+        self.sync()
+        Tag.objects.create(name='Ужин', slug='dinner', color='#000000')
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            reverse('api:recipe-favorite', args=(recipe.pk,))
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(FavoriteRecipe.objects.using('default').exists())
+        self.assertFalse(
+            FavoriteRecipe.objects.using(REPLICA_DB_ALIAS).exists()
+        )
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.tag_slugs(), ['breakfast', 'lunch', 'dinner'])
+        # Без cookie, например из другого воркера, пользователь
+        # закреплен в памяти процесса.
+        self.client.cookies.pop(STICKY_COOKIE)
+        self.assertEqual(self.tag_slugs(), ['breakfast', 'lunch', 'dinner'])
+        recent_writers.mark(self.user.pk, time.time() - 1)
+        self.assertEqual(self.tag_slugs(), ['breakfast', 'lunch'])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        bump_versions(TAGS_SCOPE)
+        DataVersion.objects.filter(scope=TAGS_SCOPE).update(
+            modified=DataVersion.objects.get(scope=TAGS_SCOPE).modified
+            + timedelta(seconds=settings.READ_REPLICA_MAX_LAG + 1)
+        )
+        self.assertEqual(self.tag_slugs(), ['breakfast', 'lunch'])
+        self.sync()
+        self.assertEqual(self.tag_slugs(), ['breakfast', 'lunch'])
+
+    def test_replica_flag_is_reset_after_request(self):
+        self.assertEqual(self.tag_slugs(), ['breakfast'])
+        self.assertFalse(use_replica.get())
+        self.assertEqual(ReplicaRouter().db_for_read(Tag), 'default')
+        self.client.force_authenticate(self.user)
+        self.assertEqual(
+            self.client.get(reverse('users:users-me')).json()['username'],
+            'user'
+        )
+        self.assertFalse(use_replica.get())
@@ -0,0 +1,28 @@
+from django.urls import reverse
+
+from api.tests.base import FoodgramTestCase
+
+
+class RecipeSearchTest(FoodgramTestCase):
+    """Индекс поиска создает миграция и обновляют триггеры базы."""
+
+    def search(self, query):
+        response = self.client.get(
+            reverse('api:recipe-list'), {'search': query}
+        )
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_search_ranks_name_above_text(self):
+        in_text = self.create_recipe(name='Каша', text='Подавать как блины.')
+        in_name = self.create_recipe(name='Блины с медом')
+        self.create_recipe(name='Суп')
+        self.assertEqual(self.search('блины'), [in_name.pk, in_text.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        recipe = self.create_recipe(name='Суп')
+        recipe.name = 'Борщ'
+        recipe.save()
+        self.assertEqual(self.search('борщ'), [recipe.pk])
+        self.assertEqual(self.search('суп'), [])
+        recipe.delete()
+        self.assertEqual(self.search('борщ'), [])
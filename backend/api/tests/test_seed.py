@@ -0,0 +1,82 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from api.tests.base import FoodgramTestCase
+from recipes.management.commands.seed import SEED_FIRST_ID, SEED_NOW
+from recipes.models import (
+    FavoriteRecipe,
+    IngredientAmount,
+    Recipe,
+    ShoppingCart
+)
+from users.models import Subscription, User
+
+
+class SeedTest(FoodgramTestCase):
+
+    def seed(self, **options):
+        call_command('seed', **{
+            'users': 6, 'recipes': 15, 'seed': 3, 'stdout': StringIO(),
+            **options
+        })
+
+    def snapshot(self):
+        """Сгенерированные строки; строки вне диапазона id команды
+        не учитываются."""
+        first = SEED_FIRST_ID
+        return [
+            list(queryset.order_by(*fields).values_list(*fields))
+            for queryset, fields in (
+                (User.objects.filter(pk__gte=first), (
+                    'pk', 'username', 'first_name', 'last_name',
+                    'date_joined', 'recipes_count', 'followers_count',
+                )),
+                (Recipe.objects.filter(pk__gte=first), (
+                    'pk', 'author_id', 'name', 'cooking_time', 'pub_date',
+                    'favorites_count',
+                )),
+                (Recipe.tags.through.objects.filter(recipe_id__gte=first), (
+                    'recipe_id', 'tag_id'
+                )),
+                (IngredientAmount.objects.filter(recipe_id__gte=first), (
+                    'recipe_id', 'ingredient_id', 'amount'
+                )),
+                (FavoriteRecipe.objects.filter(user_id__gte=first), (
+                    'user_id', 'recipe_id'
+                )),
+                (ShoppingCart.objects.filter(user_id__gte=first), (
+                    'user_id', 'recipe_id'
+                )),
+                (Subscription.objects.filter(subscriber_id__gte=first), (
+                    'subscriber_id', 'author_id'
+                )),
+            )
+        ]
+
+    def reseed(self, **options):
+        User.objects.filter(pk__gte=SEED_FIRST_ID).delete()
+        self.seed(**options)
+        return self.snapshot()
+
+    def test_same_data_on_every_run(self):
+        # Строки, которые были в базе до первого запуска, не сдвигают
+        # id и не меняют данные второго.
+        early = self.create_user('early')
+        self.create_recipe(author=early)
+        self.seed()
+        first = self.snapshot()
+        early.delete()
+        self.assertEqual(self.reseed(), first)
+        self.assertEqual(first[0][0][0], SEED_FIRST_ID)
+        self.assertLessEqual(
+            max(recipe[4] for recipe in first[1]),
+            SEED_NOW + timedelta(days=3)
+        )
+        self.assertNotEqual(self.reseed(seed=4), first)
+
+    def test_refuses_taken_ids(self):
+        self.seed()
+        with self.assertRaisesMessage(CommandError, 'fresh database'):
+            self.seed()
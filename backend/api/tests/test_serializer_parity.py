@@ -0,0 +1,88 @@
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer
+from api.serializers import FastReadRecipeSerializer, ReadRecipeSerializer
+from api.tests.base import FoodgramTestCase
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import Subscription
+
+
+class SerializerParityTest(FoodgramTestCase):
+    """FastReadRecipeSerializer с FastJSONRenderer отдает те же байты,
+    что ReadRecipeSerializer с JSONRenderer."""
+
+    def setUp(self):
+        super().setUp()
+        other = self.create_user('other')
+        favorite = self.create_recipe(tags=(0, 1))
+        in_cart = self.create_recipe(
+            author=other, amounts=(), tags=(),
+            name='Пустой "рецепт" </script>',
+            text='Строка\nс переносом,   и эмодзи 🍳',
+        )
+        processed = self.create_recipe(amounts=((2, 1),), cooking_time=1)
+        Recipe.objects.filter(pk=processed.pk).update(
+            image_webp='recipes/processed.webp',
+            image_thumbnail='recipes/processed_thumb.webp',
+        )
+        FavoriteRecipe.objects.create(user=self.user, recipe=favorite)
+        ShoppingCart.objects.create(user=self.user, recipe=in_cart)
+        Subscription.objects.create(subscriber=self.user, author=self.author)
+
+    @staticmethod
+    def get_request(user):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        return request
+
+    @staticmethod
+    def get_recipes(user, annotated):
+        queryset = Recipe.objects.with_related()
+        if annotated:
+            queryset = queryset.with_user_flags(user)
+        return list(queryset.order_by('-pub_date', '-id'))
+
+    @staticmethod
+    def render(serializer_class, renderer_class, recipes, request):
+        return renderer_class().render(serializer_class(
+            recipes, many=True, context={'request': request}
+        ).data)
+
+    def assert_identical(self, user, annotated):
+        expected = self.render(
+            ReadRecipeSerializer, JSONRenderer,
+            self.get_recipes(user, annotated), self.get_request(user)
+        )
+        # Второй проход берет тела рецептов из кэша.
+        for _ in range(2):
+            actual = self.render(
+                FastReadRecipeSerializer, FastJSONRenderer,
+                self.get_recipes(user, annotated), self.get_request(user)
+            )
+            self.assertEqual(actual, expected)
+
+    def test_anonymous(self):
+        self.assert_identical(AnonymousUser(), True)
+
+    def test_user(self):
+        self.assert_identical(self.user, True)
+
+    def test_user_without_annotations(self):
+        self.assert_identical(self.user, False)
+
+    def test_single_recipe(self):
+        recipe = Recipe.objects.with_related().with_user_flags(
+            self.user
+        ).get(author=self.author, tags__slug='lunch')
+        request = self.get_request(self.user)
+        self.assertEqual(
+            FastJSONRenderer().render(FastReadRecipeSerializer(
+                recipe, context={'request': request}
+            ).data),
+            JSONRenderer().render(ReadRecipeSerializer(
+                recipe, context={'request': request}
+            ).data)
+        )
@@ -0,0 +1,241 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Sum
+from django.urls import reverse
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import (
+    Ingredient,
+    IngredientAmount,
+    ShoppingCart,
+    ShoppingListItem
+)
+from recipes.shopping_lists import rebuild_shopping_lists
+
+QUERIES_ON_UPDATE = 23
+
+
+class ShoppingListTest(FoodgramTestCase):
+    """Список покупок совпадает с суммой ингредиентов корзины после
+    любого изменения корзины и рецептов."""
+
+    def setUp(self):
+        super().setUp()
+        self.pancakes = self.create_recipe(amounts=((0, 100), (1, 200)))
+        self.omelette = self.create_recipe(amounts=((1, 50), (2, 3)))
+        self.client.force_authenticate(self.user)
+
+    def shopping_list(self, user=None):
+        return dict(ShoppingListItem.objects.filter(
+            user=user or self.user
+        ).values_list('ingredient__name', 'amount'))
+
+    def assert_shopping_list(self, expected, user=None):
+        self.assertEqual(self.shopping_list(user), expected)
+        self.assertEqual(rebuild_shopping_lists(), 0)
+
+    def cart_url(self, recipe):
+        return reverse('api:recipe-shopping-cart', args=(recipe.pk,))
+
+    def test_add_and_remove(self):
+        self.client.post(self.cart_url(self.pancakes))
+        self.client.post(self.cart_url(self.omelette))
+        self.assert_shopping_list({'Мука': 100, 'Молоко': 250, 'Яйцо': 3})
+        self.client.delete(self.cart_url(self.pancakes))
+        self.assert_shopping_list({'Молоко': 50, 'Яйцо': 3})
+        self.client.delete(self.cart_url(self.omelette))
+        self.assert_shopping_list({})
+
+    def test_bulk_add_and_remove(self):
+        url = reverse('api:recipe-shopping-cart-bulk')
+        ids = [self.pancakes.pk, self.omelette.pk]
+        self.client.post(url, {'ids': ids}, format='json')
+        self.assert_shopping_list({'Мука': 100, 'Молоко': 250, 'Яйцо': 3})
+        self.client.delete(url, {'ids': ids[:1]}, format='json')
+        self.assert_shopping_list({'Молоко': 50, 'Яйцо': 3})
+
+    def test_drifted_list_does_not_go_below_zero(self):
+        self.client.post(self.cart_url(self.pancakes))
+        ShoppingListItem.objects.filter(user=self.user).update(amount=1)
+        response = self.client.delete(self.cart_url(self.pancakes))
+        self.assertEqual(response.status_code, 204)
+        self.assert_shopping_list({})
+
+    def test_recipe_update(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.pancakes)
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            reverse('api:recipe-detail', args=(self.pancakes.pk,)), {
+                'ingredients': [
+                    {'id': self.ingredients[1].pk, 'amount': 300},
+                    {'id': self.ingredients[2].pk, 'amount': 2},
+                ],
+                'tags': [self.tags[0].pk],
+            }, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assert_shopping_list({'Молоко': 300, 'Яйцо': 2})
+
+    def patch_ingredients(self, recipe, amounts):
+        return self.client.patch(
+            reverse('api:recipe-detail', args=(recipe.pk,)), {
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': amount}
+                    for ingredient, amount in amounts
+                ],
+                'tags': [self.tags[0].pk],
+            }, format='json'
+        )
+
+    def add_amounts(self, recipe, ingredients):
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in ingredients
+        )
+
+    def test_recipe_update_queries_do_not_depend_on_removed_rows(self):
+        flour = self.ingredients[0]
+        spices = [
+            Ingredient.objects.create(
+                name=f'Специя {number}', measurement_unit='г'
+            )
+            for number in range(10)
+        ]
+        small = self.create_recipe(amounts=((0, 10),))
+        large = self.create_recipe(amounts=((0, 10),))
+        self.client.force_authenticate(self.author)
+        for recipe in (small, large):
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+            # Первое изменение рецепта создает строку его версии.
+            self.patch_ingredients(recipe, [(flour, 10)])
+        self.add_amounts(small, spices[:1])
+        self.add_amounts(large, spices)
+        rebuild_shopping_lists()
+        with self.assertNumQueries(QUERIES_ON_UPDATE):
+            self.patch_ingredients(small, [(flour, 20)])
+        with self.assertNumQueries(QUERIES_ON_UPDATE):
+            self.patch_ingredients(large, [(flour, 20)])
+        self.assert_shopping_list({'Мука': 40})
+
+    def test_ingredient_amount_changes_outside_serializer(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.pancakes)
+        milk, flour = self.pancakes.ingredientamounts.order_by(
+            'ingredient__name'
+        )
+        milk.amount = 150
+        milk.save()
+        self.assert_shopping_list({'Мука': 100, 'Молоко': 150})
+        flour.ingredient = self.ingredients[2]
+        flour.save()
+        self.assert_shopping_list({'Молоко': 150, 'Яйцо': 100})
+        flour.delete()
+        self.assert_shopping_list({'Молоко': 150})
+        IngredientAmount.objects.create(
+            recipe=self.pancakes, ingredient=self.ingredients[0], amount=5
+        )
+        self.assert_shopping_list({'Мука': 5, 'Молоко': 150})
+
+    def test_recipe_deletion(self):
+        other = self.create_user('other')
+        for user in (self.user, other):
+            ShoppingCart.objects.create(user=user, recipe=self.pancakes)
+            ShoppingCart.objects.create(user=user, recipe=self.omelette)
+        self.pancakes.delete()
+        self.assert_shopping_list({'Молоко': 50, 'Яйцо': 3})
+        self.assert_shopping_list({'Молоко': 50, 'Яйцо': 3}, other)
+
+    def test_seed_builds_shopping_lists(self):
+        call_command(
+            'seed', users=5, recipes=20, cart_per_user=3, stdout=StringIO()
+        )
+        self.assertTrue(ShoppingListItem.objects.exists())
+        self.assertEqual(rebuild_shopping_lists(), 0)
+
+
+class ShoppingListDownloadTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('api:recipe-download-shopping-cart')
+        for amounts in (((0, 100), (1, 200)), ((1, 50), (2, 3))):
+            ShoppingCart.objects.create(
+                user=self.user, recipe=self.create_recipe(amounts=amounts)
+            )
+        self.client.force_authenticate(self.user)
+
+    def old_download(self):
+        """Тело ответа в том виде, в каком его собирало представление
+        до потоковой выдачи."""
+        ingredients = IngredientAmount.objects.filter(
+            recipe__shoppingcarts__user=self.user
+        ).values(
+            'ingredient__name', 'ingredient__measurement_unit'
+        ).annotate(amount=Sum('amount')).order_by('ingredient__name')
+        output = ('Список покупок\n\n')
+        output += '\n'.join(
+            [f'{ingredient["ingredient__name"]}'
+             f' ({ingredient["ingredient__measurement_unit"]})'
+             f' - {ingredient["amount"]}'
+             for ingredient in ingredients
+             ]
+        )
+        return output.encode()
+
+    def download(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assert_txt_matches_old_output(self):
+        response = self.download()
+        self.assertEqual(
+            b''.join(response.streaming_content), self.old_download()
+        )
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename=shopping_list.txt'
+        )
+
+    def test_txt_matches_old_output(self):
+        self.assert_txt_matches_old_output()
+        ShoppingCart.objects.filter(user=self.user).delete()
+        self.assert_txt_matches_old_output()
+
+    def test_formats(self):
+        response = self.download(format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            'Ингредиент,Единица измерения,Количество\r\n'
+            'Молоко,мл,250\r\nМука,г,100\r\nЯйцо,шт,3\r\n'
+        )
+        response = self.download(format='json')
+        self.assertEqual(
+            response['Content-Type'], 'application/json; charset=utf-8'
+        )
+        self.assertEqual(
+            json.loads(b''.join(response.streaming_content)),
+            [
+                {'name': 'Молоко', 'measurement_unit': 'мл', 'amount': 250},
+                {'name': 'Мука', 'measurement_unit': 'г', 'amount': 100},
+                {'name': 'Яйцо', 'measurement_unit': 'шт', 'amount': 3},
+            ]
+        )
+
+    def test_errors_are_json(self):
+        response = self.client.get(self.url, {'format': 'pdf'})
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('txt, csv, json', response.json()['detail'])
+        self.client.force_authenticate(None)
+        for format in ('txt', 'csv'):
+            with self.subTest(format=format):
+                response = self.client.get(self.url, {'format': format})
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(
+                    response['Content-Type'], 'application/json'
+                )
+                self.assertIn('detail', response.json())
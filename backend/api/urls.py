@@ -5,6 +5,7 @@ from api.views import (
     TagViewSet,
     RecipeViewSet,
     IngredientViewSet,
+    RequestMetricsView,
 )
 
 app_name = 'api'
@@ -15,5 +16,9 @@ router_v1.register(r'recipes', RecipeViewSet, basename='recipe')
 router_v1.register(r'ingredients', IngredientViewSet, basename='ingredient')
 
 urlpatterns = [
+    path(
+        'metrics/requests/', RequestMetricsView.as_view(),
+        name='request-metrics'
+    ),
     path('', include(router_v1.urls)),
 ]
@@ -1,10 +1,12 @@
-from django.db.models import Sum
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.http import HttpResponse
-from rest_framework.permissions import IsAuthenticated
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 
 from recipes.models import (
@@ -12,22 +14,47 @@ from recipes.models import (
     Tag, Ingredient,
     ShoppingCart,
     FavoriteRecipe,
-    IngredientAmount
+    ShoppingListItem
+)
+from foodgram.metrics import request_metrics
+from foodgram.replicas import ReplicaReadMixin
+from recipes.feeds import Timeline
+from recipes.ingredient_index import ingredient_index
+from recipes.versions import INGREDIENTS_SCOPE, TAGS_SCOPE
+from api import bulk
+from api.caches import prerendered
+from api.conditions import (
+    VersionedRecipesMixin,
+    get_request_versions,
+    versioned_condition
 )
 from api.filters import RecipeFilter, IngredientFilter
-from api.paginations import LimitPageNumberPagination
+from api.paginations import (
+    FeedCursorPagination,
+    LimitPageNumberPagination,
+    RecipeCursorPagination
+)
 from .permissions import UserIsAuthor
+from .renderers import (
+    ShoppingListNegotiation,
+    TxtShoppingListRenderer,
+    CsvShoppingListRenderer,
+    JsonShoppingListRenderer
+)
 from .serializers import (
+    BulkIdsSerializer,
     WriteFavoriteRecipeSerializer,
     WriteShoppingCartRecipeSerializer,
-    ReadRecipeSerializer,
+    FastReadRecipeSerializer,
+    ShoppingListItemSerializer,
     WriteRecipeSerializer,
     TagSerializer,
     IngredientSerializer
 )
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, VersionedRecipesMixin,
+                    viewsets.ModelViewSet):
     """ViewSet рецептов."""
 
     queryset = Recipe.objects.all()
@@ -36,26 +63,70 @@ class RecipeViewSet(viewsets.ModelViewSet):
     pagination_class = LimitPageNumberPagination
     http_method_names = ['get', 'post', 'patch', 'delete']
     permission_classes = (UserIsAuthor, )
+    replica_actions = ('list', 'retrieve', 'feed')
 
-    def get_serializer_class(self):
+    @property
+    def paginator(self):
+        if self.action == 'feed':
+            self.pagination_class = FeedCursorPagination
+        elif RecipeCursorPagination.is_requested(self.request):
+            self.pagination_class = RecipeCursorPagination
+        return super().paginator
+
+    def get_queryset(self):
         if self.action in ('list', 'retrieve'):
-            return ReadRecipeSerializer
+            return Recipe.objects.with_user_flags(
+                self.request.user
+            )
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'retrieve', 'feed'):
+            return FastReadRecipeSerializer
         return WriteRecipeSerializer
 
+    def paginated_response(self, page):
+        """Страница рецептов с условным GET."""
+        envelope = self.get_paginated_response([]).data
+        return self.versioned_response(
+            page,
+            lambda: self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            ),
+            [envelope.get(key) for key in ('count', 'next', 'previous')]
+        )
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        return self.paginated_response(page)
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        return self.versioned_response(
+            [recipe], lambda: Response(self.get_serializer(recipe).data)
+        )
+
     def create_object(self, serial, request, pk):
         serializer = serial(
             data={'recipe': pk, 'user': request.user.pk},
             context={'request': request}
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            # По очереди с пакетными операциями того же пользователя.
+            bulk.lock_user(request.user)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_object(self, model, user, pk):
         get_object_or_404(Recipe, pk=pk)
         object = model.objects.filter(user=user, recipe__id=pk)
-        if object.exists():
-            object.delete()
+        with transaction.atomic():
+            bulk.lock_user(user)
+            deleted, _ = object.delete()
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'errors': 'Рецепт был удален ранее.'},
@@ -88,42 +159,120 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ShoppingCart, request.user, pk
         )
 
-    @action(detail=False)
+    def bulk_response(self, request, change, model):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            change(request.user, model, serializer.validated_data['ids'])
+        )
+
+    @action(detail=False, methods=('POST', ), url_path='favorite',
+            url_name='favorite-bulk',
+            permission_classes=(IsAuthenticated, ), )
+    def favorite_bulk(self, request):
+        return self.bulk_response(request, bulk.add_recipes, FavoriteRecipe)
+
+    @favorite_bulk.mapping.delete
+    def delete_favorite_bulk(self, request):
+        return self.bulk_response(
+            request, bulk.remove_recipes, FavoriteRecipe
+        )
+
+    @action(detail=False, methods=('POST', ), url_path='shopping_cart',
+            url_name='shopping-cart-bulk',
+            permission_classes=(IsAuthenticated, ), )
+    def shopping_cart_bulk(self, request):
+        return self.bulk_response(request, bulk.add_recipes, ShoppingCart)
+
+    @shopping_cart_bulk.mapping.delete
+    def delete_shopping_cart_bulk(self, request):
+        return self.bulk_response(
+            request, bulk.remove_recipes, ShoppingCart
+        )
+
+    @action(detail=False, permission_classes=(IsAuthenticated, ))
+    def feed(self, request):
+        return self.paginated_response(
+            self.paginate_queryset(Timeline(request.user))
+        )
+
+    @action(
+        detail=False, permission_classes=(IsAuthenticated, ),
+        renderer_classes=(
+            TxtShoppingListRenderer,
+            CsvShoppingListRenderer,
+            JsonShoppingListRenderer,
+        ),
+        content_negotiation_class=ShoppingListNegotiation,
+    )
     def download_shopping_cart(self, request):
-        ingredients = IngredientAmount.objects.filter(
-            recipe__shoppingcarts__user=request.user
+        ingredients = ShoppingListItem.objects.filter(
+            user=request.user
         ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount')).order_by('ingredient__name')
-        output = ('Список покупок\n\n')
-        output += '\n'.join(
-            [f'{ingredient["ingredient__name"]}'
-             f' ({ingredient["ingredient__measurement_unit"]})'
-             f' - {ingredient["amount"]}'
-             for ingredient in ingredients
-             ]
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        ).order_by('ingredient__name')
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients.iterator()),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
         )
-        filename = 'shopping_list.txt'
-        response = HttpResponse(output, content_type='text/plain')
+        filename = f'shopping_list.{renderer.format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
 
+    @action(detail=False, permission_classes=(IsAuthenticated, ))
+    def shopping_cart_summary(self, request):
+        items = ShoppingListItem.objects.filter(
+            user=request.user
+        ).select_related('ingredient').order_by('ingredient__name')
+        return Response(ShoppingListItemSerializer(items, many=True).data)
+
 
-class TagViewSet(viewsets.ModelViewSet):
+@method_decorator(versioned_condition(TAGS_SCOPE), name='list')
+@method_decorator(versioned_condition(TAGS_SCOPE), name='retrieve')
+@method_decorator(prerendered(TAGS_SCOPE), name='list')
+class TagViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """ViewSet категорий."""
 
     queryset = Tag.objects.all().order_by('name')
     serializer_class = TagSerializer
     pagination_class = None
     http_method_names = ['get']
+    replica_actions = ('list', 'retrieve')
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+@method_decorator(versioned_condition(INGREDIENTS_SCOPE), name='list')
+@method_decorator(versioned_condition(INGREDIENTS_SCOPE), name='retrieve')
+@method_decorator(prerendered(INGREDIENTS_SCOPE), name='list')
+class IngredientViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """ViewSet ингредиента."""
 
     queryset = Ingredient.objects.all().order_by('name')
     serializer_class = IngredientSerializer
     pagination_class = None
     http_method_names = ['get']
+    replica_actions = ('list', 'retrieve')
     filter_backends = (IngredientFilter,)
     search_fields = ('^name',)
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get(IngredientFilter.search_param)
+        if name:
+            [(version, _)] = get_request_versions(
+                request, (INGREDIENTS_SCOPE,)
+            ).values()
+            return Response(ingredient_index.search(name, version))
+        return super().list(request, *args, **kwargs)
+
+
+class RequestMetricsView(APIView):
+    """Гистограмма времени ответов по endpoint'ам текущего процесса."""
+
+    permission_classes = (IsAdminUser, )
+
+    def get(self, request):
+        return Response(request_metrics.snapshot())
+
+    def delete(self, request):
+        request_metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
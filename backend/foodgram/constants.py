@@ -9,3 +9,8 @@ DOWNLOAD_SHOPPING_CART = 'download_shopping_cart'
 SET_PASSWORD = 'set_password'
 DEFAULT_TRUNCATE = 25
 MIN_VALUE = 1
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_DIMENSIONS = (1600, 1600)
+THUMBNAIL_DIMENSIONS = (480, 480)
+IMAGE_VARIANTS_PATH = 'recipes/images/variants/'
+MAX_BULK_IDS = 100
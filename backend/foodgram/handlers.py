@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connections
+
+
+def next_part(parts):
+    return next(parts, None)
+
+
+def close_stream(response):
+    try:
+        response.close()
+    finally:
+        connections.close_all()
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """ASGI-обработчик, который отдает потоковые ответы по частям,
+    не блокируя цикл событий.
+
+    Django 3.2 итерирует потоковый ответ прямо в цикле событий: там
+    недоступен ORM, а пока строится часть ответа, стоят все остальные
+    запросы. Здесь каждая часть строится в потоке, закрепленном за
+    ответом, поэтому все запросы потока идут через одно соединение
+    с БД. Пока медленный клиент принимает данные, поток простаивает,
+    а цикл событий обслуживает других клиентов.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = [
+            (
+                header.encode('ascii') if isinstance(header, str)
+                else bytes(header),
+                value.encode('latin1') if isinstance(value, str)
+                else bytes(value),
+            )
+            for header, value in response.items()
+        ]
+        headers.extend(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='stream'
+        )
+        in_stream_thread = sync_to_async(
+            next_part, thread_sensitive=False, executor=executor
+        )
+        try:
+            # Итератор ленивый: первый запрос к БД выполнит next_part.
+            parts = iter(response)
+            while True:
+                part = await in_stream_thread(parts)
+                if part is None:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            await sync_to_async(
+                close_stream, thread_sensitive=False, executor=executor
+            )(response)
+            executor.shutdown(wait=False)
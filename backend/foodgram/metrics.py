@@ -0,0 +1,80 @@
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+PERCENTILES = (50, 95, 99)
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def percentile(values, percent):
+    """Процентиль методом ближайшего ранга."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[rank]
+
+
+def histogram(values):
+    """Число значений в каждой корзине HISTOGRAM_BUCKETS_MS и выше."""
+    counts = dict.fromkeys(
+        [f'le_{bound}' for bound in HISTOGRAM_BUCKETS_MS] + ['inf'], 0
+    )
+    for value in values:
+        bound = next(
+            (bound for bound in HISTOGRAM_BUCKETS_MS if value <= bound), None
+        )
+        counts['inf' if bound is None else f'le_{bound}'] += 1
+    return counts
+
+
+class RequestMetrics:
+    """Скользящее окно замеров запросов по каждому endpoint'у.
+
+    Хранит последние REQUEST_METRICS_WINDOW замеров на endpoint
+    в памяти процесса.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, label, wall_ms, db_ms, queries, duplicates):
+        with self._lock:
+            self._samples[label].append(
+                (wall_ms, db_ms, queries, duplicates)
+            )
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    def snapshot(self):
+        with self._lock:
+            samples = {
+                label: list(rows) for label, rows in self._samples.items()
+            }
+        return {
+            label: self.summarize(rows)
+            for label, rows in sorted(samples.items())
+        }
+
+    @staticmethod
+    def summarize(rows):
+        wall, db, queries, duplicates = zip(*rows)
+        summary = {'requests': len(rows)}
+        for percent in PERCENTILES:
+            summary[f'p{percent}_ms'] = round(percentile(wall, percent), 2)
+        summary.update({
+            'db_p95_ms': round(percentile(db, 95), 2),
+            'queries_avg': round(sum(queries) / len(rows), 2),
+            'queries_max': max(queries),
+            'duplicates_max': max(duplicates),
+            'histogram_ms': histogram(wall),
+        })
+        return summary
+
+
+request_metrics = RequestMetrics(settings.REQUEST_METRICS_WINDOW)
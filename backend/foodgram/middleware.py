@@ -0,0 +1,194 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async
+)
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from foodgram.metrics import request_metrics
+
+orm_executor = ThreadPoolExecutor(
+    max_workers=settings.ORM_THREAD_POOL_SIZE, thread_name_prefix='orm'
+)
+
+
+def resolve_label(request, view_func):
+    """Имя endpoint'а: класс представления и действие DRF."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__qualname__', 'unknown')
+    method = request.method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+class QueryCollector:
+    """Считает время и число запросов ко всем базам данных.
+
+    Дубликатами считаются повторы одного и того же SQL без учета
+    параметров: так выглядит N+1.
+    """
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.queries = 0
+        self.duplicates = 0
+        self.statements = set()
+        self.stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            if sql in self.statements:
+                self.duplicates += 1
+            else:
+                self.statements.add(sql)
+
+    def start(self):
+        self.stack = ExitStack()
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self))
+
+    def stop(self):
+        self.stack.close()
+
+
+class RequestTimingMiddleware:
+    """Замеряет время ответа, время и число запросов к БД.
+
+    Результат отдается в заголовке Server-Timing и попадает
+    в скользящую гистограмму foodgram.metrics.request_metrics.
+    Для потоковых ответов заголовок описывает работу до начала
+    потока, а в гистограмму замер попадает после его отправки.
+    Под ASGI запросы к БД считаются в потоке, где выполняется
+    представление (см. OrmThreadPoolMiddleware).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        request._timing_label = 'unresolved'
+        collector = QueryCollector()
+        start = time.perf_counter()
+        collector.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            collector.stop()
+        return self.finish(request, response, collector, start)
+
+    async def __acall__(self, request):
+        request._timing_label = 'unresolved'
+        collector = request._query_collector = QueryCollector()
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.finish(request, response, collector, start)
+
+    def finish(self, request, response, collector, start):
+        wall = time.perf_counter() - start
+        response['Server-Timing'] = (
+            f'app;dur={wall * 1000:.1f}, '
+            f'db;dur={collector.db_time * 1000:.1f};'
+            f'desc="{collector.queries} queries, '
+            f'{collector.duplicates} duplicates"'
+        )
+        if response.streaming:
+            response.streaming_content = self.measure_stream(
+                request._timing_label, response.streaming_content,
+                collector, start
+            )
+        else:
+            self.record(request._timing_label, collector, start)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing_label = resolve_label(request, view_func)
+
+    def measure_stream(self, label, content, collector, start):
+        collector.start()
+        try:
+            yield from content
+        finally:
+            collector.stop()
+            self.record(label, collector, start)
+
+    @staticmethod
+    def record(label, collector, start):
+        request_metrics.record(
+            label,
+            (time.perf_counter() - start) * 1000,
+            collector.db_time * 1000,
+            collector.queries,
+            collector.duplicates,
+        )
+
+
+def call_view_in_thread(request, view_func, view_args, view_kwargs):
+    collector = getattr(request, '_query_collector', None)
+    if collector is not None:
+        collector.start()
+    try:
+        response = view_func(request, *view_args, **view_kwargs)
+        if response is None:
+            raise ValueError(
+                f'The view {view_func.__qualname__} returned None instead '
+                'of an HttpResponse object.'
+            )
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        # Поток ответа строит foodgram.handlers.StreamingASGIHandler.
+        return response
+    finally:
+        if collector is not None:
+            collector.stop()
+        close_old_connections()
+
+
+class OrmThreadPoolMiddleware:
+    """Под ASGI выполняет синхронные представления в пуле потоков.
+
+    Django 3.2 запускает синхронные представления в единственном общем
+    потоке, и медленный запрос задерживает все остальные. Здесь
+    представление вместе с рендерингом ответа выполняется в пуле из
+    ORM_THREAD_POOL_SIZE потоков, а цикл событий в это время
+    обслуживает других клиентов. Под WSGI ничего не делает.
+    Должен стоять последним в MIDDLEWARE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.run_view_in_pool
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    async def run_view_in_pool(self, request, view_func, view_args,
+                               view_kwargs):
+        if iscoroutinefunction(view_func):
+            return None
+        return await sync_to_async(
+            call_view_in_thread, thread_sensitive=False,
+            executor=orm_executor
+        )(request, view_func, view_args, view_kwargs)
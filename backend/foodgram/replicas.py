@@ -0,0 +1,184 @@
+"""Чтение с реплики базы данных.
+
+Безопасные запросы к перечисленным в replica_actions действиям читают
+с реплики, все записи идут в основную базу. Пользователь, который
+только что что-то изменил, READ_REPLICA_STICKY_SECONDS секунд читает
+из основной базы, чтобы увидеть свои изменения. Если реплика отстала
+больше чем на READ_REPLICA_MAX_LAG секунд, чтение тоже уходит
+в основную базу.
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_DB_ALIAS = 'replica'
+STICKY_COOKIE = 'primary_until'
+MAX_RECENT_WRITERS = 10000
+
+use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+class ReplicaRouter:
+    """Направляет чтение на реплику, пока это разрешено use_replica."""
+
+    def db_for_read(self, model, **hints):
+        if use_replica.get() and replica_configured():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != REPLICA_DB_ALIAS
+
+
+class ReplicaLag:
+    """Отставание реплики по последнему изменению DataVersion.
+
+    Каждая запись в данные API увеличивает версию, поэтому разница
+    между последними изменениями версий в основной базе и в реплике
+    показывает, за сколько секунд записи реплика еще не получила.
+    Значение пересчитывается не чаще раза в READ_REPLICA_LAG_INTERVAL.
+    """
+
+    def __init__(self):
+        self._checked_at = None
+        self._lag = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._checked_at is not None
+                and now - self._checked_at < settings.READ_REPLICA_LAG_INTERVAL
+            ):
+                return self._lag
+            self._checked_at = now
+        lag = self.measure()
+        with self._lock:
+            self._lag = lag
+        return lag
+
+    @staticmethod
+    def measure():
+        from recipes.models import DataVersion
+
+        def last_modified(alias):
+            return DataVersion.objects.using(alias).aggregate(
+                modified=Max('modified')
+            )['modified']
+
+        try:
+            primary = last_modified(DEFAULT_DB_ALIAS)
+            replica = last_modified(REPLICA_DB_ALIAS)
+        except Exception:
+            return None
+        if primary is None:
+            return 0.0
+        if replica is None:
+            return None
+        return max(0.0, (primary - replica).total_seconds())
+
+
+replica_lag = ReplicaLag()
+
+
+class RecentWriters:
+    """Пользователи, писавшие в базу за последние секунды, в памяти
+    процесса. Для других процессов то же сообщает cookie."""
+
+    def __init__(self):
+        self._until = {}
+        self._lock = threading.Lock()
+
+    def mark(self, user_id, until):
+        with self._lock:
+            if len(self._until) >= MAX_RECENT_WRITERS:
+                now = time.time()
+                self._until = {
+                    key: value for key, value in self._until.items()
+                    if value > now
+                }
+            self._until[user_id] = until
+
+    def is_recent(self, user_id):
+        with self._lock:
+            return self._until.get(user_id, 0) > time.time()
+
+
+recent_writers = RecentWriters()
+
+
+def is_sticky(request):
+    try:
+        until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+    except ValueError:
+        until = 0
+    if until > time.time():
+        return True
+    return (
+        request.user.is_authenticated
+        and recent_writers.is_recent(request.user.pk)
+    )
+
+
+def can_read_from_replica(request):
+    if not replica_configured() or is_sticky(request):
+        return False
+    lag = replica_lag.get()
+    return lag is not None and lag <= settings.READ_REPLICA_MAX_LAG
+
+
+class ReplicaReadMixin:
+    """Читает с реплики в безопасных запросах к replica_actions
+    и закрепляет пользователя за основной базой после записи."""
+
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            request.method in SAFE_METHODS
+            and self.action in self.replica_actions
+            and can_read_from_replica(request)
+        ):
+            self._replica_token = use_replica.set(True)
+
+    def dispatch(self, request, *args, **kwargs):
+        self._replica_token = None
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._replica_token is not None:
+                use_replica.reset(self._replica_token)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and replica_configured()
+        ):
+            self.stick_to_primary(response)
+        return response
+
+    def stick_to_primary(self, response):
+        until = time.time() + settings.READ_REPLICA_STICKY_SECONDS
+        if self.request.user.is_authenticated:
+            recent_writers.mark(self.request.user.pk, until)
+        response.set_cookie(
+            STICKY_COOKIE, f'{until:.3f}',
+            max_age=settings.READ_REPLICA_STICKY_SECONDS,
+            httponly=True, samesite='Lax'
+        )
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.middleware.OrmThreadPoolMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -105,6 +107,28 @@ else:
         }
     }
 
+# Необязательная реплика только для чтения, см. foodgram/replicas.py.
+if os.getenv('SQLITE_REPLICA_NAME') and os.getenv('USE_SQLITE') == 'True':
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('SQLITE_REPLICA_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif os.getenv('POSTGRES_REPLICA_HOST') or os.getenv('POSTGRES_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('POSTGRES_REPLICA_DB', DATABASES['default']['NAME']),
+        'HOST': os.getenv(
+            'POSTGRES_REPLICA_HOST', DATABASES['default']['HOST']
+        ),
+        'PORT': os.getenv(
+            'POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']
+        ),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.replicas.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -148,6 +172,25 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+
+REQUEST_METRICS_WINDOW = int(os.getenv('REQUEST_METRICS_WINDOW', 1000))
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+# Кэш токенов у каждого воркера свой: удаленный или замененный токен
+# в других воркерах действует еще до TOKEN_CACHE_TTL секунд.
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 5))
+
+ORM_THREAD_POOL_SIZE = int(os.getenv('ORM_THREAD_POOL_SIZE', 16))
+
+RECIPE_BODY_CACHE_SIZE = int(os.getenv('RECIPE_BODY_CACHE_SIZE', 10000))
+
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 10000))
+
+READ_REPLICA_STICKY_SECONDS = int(os.getenv('READ_REPLICA_STICKY_SECONDS', 5))
+READ_REPLICA_MAX_LAG = float(os.getenv('READ_REPLICA_MAX_LAG', 2))
+READ_REPLICA_LAG_INTERVAL = float(os.getenv('READ_REPLICA_LAG_INTERVAL', 1))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -161,7 +204,11 @@ REST_FRAMEWORK = {
     ),
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 6,
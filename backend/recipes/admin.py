@@ -23,18 +23,14 @@ class IngredientAmountInline(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    readonly_fields = ('count_in_favorite',)
+    readonly_fields = ('favorites_count',)
     inlines = (IngredientAmountInline, )
     list_display = (
         'name', 'author', 'image', 'text',
-        'cooking_time', 'count_in_favorite'
+        'cooking_time', 'favorites_count'
     )
     list_filter = ('tags', 'author', 'name')
 
-    @admin.display(description='Счетчик в избранном')
-    def count_in_favorite(self, recipe):
-        return recipe.favoriterecipes.count()
-
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
@@ -0,0 +1,46 @@
+from django.db import models
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import FavoriteRecipe, Recipe
+from users.models import Subscription, User
+
+
+def count_subquery(model, field):
+    """Число строк model, ссылающихся полем field на внешний объект."""
+    return Coalesce(
+        models.Subquery(
+            model.objects.filter(**{field: models.OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(count=models.Count('pk')).values('count'),
+            output_field=models.PositiveIntegerField(),
+        ),
+        0
+    )
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно меняет счетчик на delta одним UPDATE."""
+    change_counters(model, [pk], field, delta)
+
+
+def change_counters(model, pks, field, delta):
+    """Меняет счетчик нескольких объектов на delta одним UPDATE.
+
+    Счетчик, разошедшийся с данными, например после bulk_create без
+    сигналов, не уходит ниже нуля, иначе UPDATE нарушил бы CHECK
+    положительного поля и сорвал бы удаление.
+    """
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(models.F(field) + delta, 0)}
+    )
+
+
+def recount_counters():
+    """Пересчитывает все денормализованные счетчики по исходным таблицам."""
+    Recipe.objects.update(
+        favorites_count=count_subquery(FavoriteRecipe, 'recipe')
+    )
+    User.objects.update(
+        recipes_count=count_subquery(Recipe, 'author'),
+        followers_count=count_subquery(Subscription, 'author'),
+    )
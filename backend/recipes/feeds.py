@@ -0,0 +1,191 @@
+"""Ленты рецептов авторов, на которых подписан пользователь.
+
+Рецепт автора, у которого не больше FEED_FANOUT_MAX_FOLLOWERS
+подписчиков, при публикации раскладывается по лентам всех подписчиков
+одним INSERT ... SELECT (FeedEntry), и лента читается по индексу
+(user, pub_date, recipe). Рецепты популярных авторов в ленты не
+раскладываются: при чтении они выбираются по индексу
+(author, pub_date, id) и сливаются с лентой. Так публикация стоит
+не больше FEED_FANOUT_MAX_FOLLOWERS вставок, а страница ленты -
+не больше трех запросов независимо от числа подписок.
+
+Когда после отписки у автора снова FEED_FANOUT_MAX_FOLLOWERS
+подписчиков, unfollow() раскладывает по лентам его рецепты, в том числе
+опубликованные за время популярности. rebuild_feeds() сверяет ленты
+с подписками целиком.
+"""
+import heapq
+from itertools import groupby
+
+from django.conf import settings
+from django.db import connection, models, transaction
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription, User
+
+CHUNK_SIZE = 1000
+ENTRY_FIELDS = ('user', 'author', 'recipe', 'pub_date')
+
+
+def fanout_authors(author_ids):
+    """Авторы из author_ids, чьи рецепты раскладываются по лентам."""
+    return User.objects.filter(
+        pk__in=author_ids,
+        followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values('pk')
+
+
+def insert_entries(recipes, subscriber_ids=None):
+    """Добавляет рецепты recipes в ленты подписчиков их авторов
+    (только subscriber_ids, если заданы) и возвращает число новых
+    строк. Уже разложенные рецепты пропускаются."""
+    if subscriber_ids is None:
+        recipes = recipes.filter(author__authors__isnull=False)
+    else:
+        recipes = recipes.filter(
+            author__authors__subscriber__in=subscriber_ids
+        )
+    # Все поля - аннотации, чтобы порядок столбцов SELECT совпал
+    # с ENTRY_FIELDS.
+    rows = recipes.order_by().annotate(
+        feed_user=models.F('author__authors__subscriber'),
+        feed_author=models.F('author_id'),
+        feed_recipe=models.F('id'),
+        feed_pub_date=models.F('pub_date'),
+    ).values_list(
+        'feed_user', 'feed_author', 'feed_recipe', 'feed_pub_date'
+    )
+    sql, params = rows.query.sql_with_params()
+    columns = ', '.join(
+        connection.ops.quote_name(FeedEntry._meta.get_field(name).column)
+        for name in ENTRY_FIELDS
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{connection.ops.quote_name(FeedEntry._meta.db_table)} '
+            f'({columns}) {sql} '
+            f'{connection.ops.ignore_conflicts_suffix_sql(True)}',
+            params
+        )
+        return cursor.rowcount
+
+
+def publish(recipe):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    insert_entries(Recipe.objects.filter(
+        pk=recipe.pk, author__in=fanout_authors([recipe.author_id])
+    ))
+
+
+def follow(user_id, author_ids):
+    """Добавляет в ленту подписчика рецепты новых авторов."""
+    insert_entries(
+        Recipe.objects.filter(author__in=fanout_authors(author_ids)),
+        [user_id]
+    )
+
+
+def unfollow(user_id, author_ids):
+    """Убирает из ленты подписчика рецепты авторов. Вызывается после
+    уменьшения followers_count: авторы, ставшие обычными, возвращаются
+    в ленты остальных подписчиков."""
+    FeedEntry.objects.filter(
+        user_id=user_id, author_id__in=author_ids
+    ).delete()
+    insert_entries(Recipe.objects.filter(
+        author__in=User.objects.filter(
+            pk__in=author_ids,
+            followers_count=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).values('pk')
+    ))
+
+
+def keyset(queryset, position, reverse, pk_field):
+    """Строки после позиции (pub_date, id) в порядке ленты:
+    от новых к старым или, при reverse, наоборот."""
+    lookup = 'gt' if reverse else 'lt'
+    if position is not None:
+        pub_date, pk = position
+        queryset = queryset.filter(
+            models.Q(**{f'pub_date__{lookup}': pub_date})
+            | models.Q(pub_date=pub_date, **{f'{pk_field}__{lookup}': pk})
+        )
+    ordering = ('pub_date', pk_field)
+    if not reverse:
+        ordering = tuple(f'-{field}' for field in ordering)
+    return queryset.order_by(*ordering).values_list('pub_date', pk_field)
+
+
+class Timeline:
+    """Лента пользователя: разложенные рецепты обычных авторов,
+    слитые с рецептами популярных."""
+
+    def __init__(self, user):
+        self.user = user
+
+    def popular_authors(self):
+        return list(Subscription.objects.filter(
+            subscriber=self.user,
+            author__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).values_list('author_id', flat=True))
+
+    def fetch(self, position, reverse, limit):
+        """До limit рецептов после позиции (pub_date, id) с флагами
+        пользователя, в порядке ленты."""
+        sources = [list(keyset(
+            FeedEntry.objects.filter(user=self.user),
+            position, reverse, 'recipe_id'
+        )[:limit])]
+        authors = self.popular_authors()
+        if authors:
+            sources.append(list(keyset(
+                Recipe.objects.filter(author_id__in=authors),
+                position, reverse, 'id'
+            )[:limit]))
+        # Рецепт автора, ставшего популярным, может быть в обоих
+        # источниках.
+        keys = [
+            key for key, _ in groupby(
+                heapq.merge(*sources, reverse=not reverse)
+            )
+        ][:limit]
+        recipes = Recipe.objects.with_user_flags(self.user).in_bulk(
+            [pk for _, pk in keys]
+        )
+        return [recipes[pk] for _, pk in keys if pk in recipes]
+
+
+def rebuild_feeds(chunk_size=CHUNK_SIZE):
+    """Сверяет ленты с подписками: удаляет рецепты авторов, на которых
+    пользователь больше не подписан, и раскладывает недостающие
+    рецепты обычных авторов.
+
+    Возвращает число добавленных и удаленных строк.
+    """
+    added = removed = 0
+    last_id = 0
+    while True:
+        chunk = list(User.objects.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list('pk', flat=True)[:chunk_size])
+        if not chunk:
+            return added, removed
+        with transaction.atomic():
+            removed += FeedEntry.objects.filter(
+                user_id__in=chunk
+            ).exclude(
+                models.Exists(Subscription.objects.filter(
+                    subscriber=models.OuterRef('user'),
+                    author=models.OuterRef('author')
+                ))
+            ).delete()[0]
+            added += insert_entries(
+                Recipe.objects.filter(
+                    author__followers_count__lte=(
+                        settings.FEED_FANOUT_MAX_FOLLOWERS
+                    )
+                ),
+                chunk
+            )
+        last_id = chunk[-1]
@@ -0,0 +1,123 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from foodgram.constants import (
+    IMAGE_MAX_DIMENSIONS,
+    THUMBNAIL_DIMENSIONS,
+    IMAGE_VARIANTS_PATH
+)
+from recipes.models import Recipe
+from recipes.versions import bump_versions, recipe_scope
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    thread_name_prefix='recipe-images',
+)
+
+
+def encode_webp(image, dimensions):
+    """Уменьшает копию изображения и кодирует ее в WebP без EXIF."""
+    image = image.copy()
+    image.thumbnail(dimensions)
+    buffer = BytesIO()
+    image.save(buffer, 'WEBP', quality=80, method=4)
+    return ContentFile(buffer.getvalue())
+
+
+def normalize_image(file):
+    """Перекодирует загруженное изображение: поворачивает по EXIF,
+    уменьшает до IMAGE_MAX_DIMENSIONS и сохраняет без метаданных.
+
+    Изображения с прозрачностью сохраняются в PNG, остальные в JPEG.
+    """
+    file.seek(0)
+    image = ImageOps.exif_transpose(Image.open(file))
+    image.thumbnail(IMAGE_MAX_DIMENSIONS)
+    transparent = 'A' in image.mode or 'transparency' in image.info
+    image = image.convert('RGBA' if transparent else 'RGB')
+    buffer = BytesIO()
+    if transparent:
+        image.save(buffer, 'PNG', optimize=True)
+        extension = 'png'
+    else:
+        image.save(buffer, 'JPEG', quality=90)
+        extension = 'jpg'
+    return ContentFile(
+        buffer.getvalue(), name=f'{Path(file.name).stem}.{extension}'
+    )
+
+
+def delete_variants(storage, names):
+    for name in names:
+        if name:
+            storage.delete(name)
+
+
+def process_recipe_image(recipe_id):
+    """Строит WebP и миниатюру для текущего изображения рецепта
+    и удаляет прежние варианты."""
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'image_webp', 'image_thumbnail'
+    ).first()
+    if recipe is None or not recipe.image:
+        return
+    source_name = recipe.image.name
+    storage = recipe.image.storage
+    if not storage.exists(source_name):
+        logger.warning(
+            'Recipe %s image %s does not exist', recipe_id, source_name
+        )
+        return
+    old_variants = (recipe.image_webp.name, recipe.image_thumbnail.name)
+    with recipe.image.open('rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert(
+            'RGBA' if 'transparency' in image.info or 'A' in image.mode
+            else 'RGB'
+        )
+    stem = Path(source_name).stem
+    webp_name = storage.save(
+        f'{IMAGE_VARIANTS_PATH}{stem}.webp',
+        encode_webp(image, IMAGE_MAX_DIMENSIONS)
+    )
+    thumbnail_name = storage.save(
+        f'{IMAGE_VARIANTS_PATH}{stem}_thumbnail.webp',
+        encode_webp(image, THUMBNAIL_DIMENSIONS)
+    )
+    with transaction.atomic():
+        updated = Recipe.objects.filter(
+            pk=recipe_id, image=source_name
+        ).update(image_webp=webp_name, image_thumbnail=thumbnail_name)
+        if updated:
+            # Тело рецепта в recipe_bodies кэшируется по его версии.
+            bump_versions(recipe_scope(recipe_id))
+    if not updated:
+        delete_variants(storage, (webp_name, thumbnail_name))
+        return
+    delete_variants(storage, old_variants)
+
+
+def run_in_background(recipe_id):
+    """Ошибки пула иначе теряются в невостребованном Future."""
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Processing image of recipe %s failed', recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_image_processing(recipe_id):
+    """Ставит обработку изображения в фоновый пул после записи."""
+    executor.submit(run_in_background, recipe_id)
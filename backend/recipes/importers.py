@@ -0,0 +1,330 @@
+"""Потоковый импорт справочников ингредиентов и тэгов.
+
+Строки читаются из CSV, JSON-массива или JSON Lines по одной и пишутся
+пачками фиксированного размера, поэтому память не зависит от размера
+файла. Повторный импорт того же файла ничего не дублирует: новые
+строки вставляются, существующие пропускаются или обновляются.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+
+from django.db import connection, transaction
+
+from recipes.models import Ingredient, Tag
+from recipes.versions import INGREDIENTS_SCOPE, TAGS_SCOPE, bump_versions
+
+JSON_READ_SIZE = 64 * 1024
+STAGING_TABLE = 'catalog_import_staging'
+
+
+@dataclass(frozen=True)
+class Catalog:
+    model: type
+    fields: tuple
+    key: tuple
+    scopes: tuple
+    # Уникальные поля вне ключа: строка, которая заняла бы чужое
+    # значение, считается ошибочной.
+    unique: tuple = ()
+
+    @property
+    def table(self):
+        return self.model._meta.db_table
+
+    @property
+    def value_fields(self):
+        return tuple(field for field in self.fields if field not in self.key)
+
+
+CATALOGS = {
+    'ingredients': Catalog(
+        model=Ingredient,
+        fields=('name', 'measurement_unit'),
+        key=('name', 'measurement_unit'),
+        scopes=(INGREDIENTS_SCOPE,),
+    ),
+    'tags': Catalog(
+        model=Tag,
+        fields=('name', 'color', 'slug'),
+        key=('slug',),
+        scopes=(TAGS_SCOPE,),
+        unique=('name',),
+    ),
+}
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    inserted: int = 0
+    updated: int = 0
+    invalid: int = 0
+
+    @property
+    def unchanged(self):
+        return self.read - self.invalid - self.inserted - self.updated
+
+
+def iter_csv(file, fields):
+    """Строки CSV как словари; строка заголовка необязательна."""
+    reader = csv.reader(file)
+    first = next(reader, None)
+    if first is None:
+        return
+    if set(fields) <= set(first):
+        header = first
+    else:
+        header = fields
+        yield dict(zip(header, first))
+    for row in reader:
+        yield dict(zip(header, row))
+
+
+def iter_json(file):
+    """Объекты JSON-массива верхнего уровня без загрузки файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise ValueError('JSON catalog must be an array of objects')
+            started = True
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = file.read(JSON_READ_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+        position = end
+
+
+def iter_json_lines(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_rows(path, format, fields):
+    with open(path, encoding='utf-8', newline='') as file:
+        if format == 'csv':
+            yield from iter_csv(file, fields)
+        elif format == 'json':
+            yield from iter_json(file)
+        else:
+            yield from iter_json_lines(file)
+
+
+def detect_format(path):
+    suffix = Path(path).suffix.lower()
+    return {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'json'}.get(
+        suffix, 'csv'
+    )
+
+
+def clean_row(catalog, row):
+    """Значения полей справочника или None, если строка неполная
+    или не объект."""
+    if not isinstance(row, dict):
+        return None
+    values = tuple(
+        str(row.get(field) or '').strip() for field in catalog.fields
+    )
+    if not all(values):
+        return None
+    return values
+
+
+def copy_rows(table, columns, rows):
+    """Загружает строки в таблицу PostgreSQL через COPY ... FROM STDIN."""
+    buffer = io.StringIO()
+    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote(table)} ({", ".join(map(quote, columns))}) '
+            'FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+
+
+class CatalogImporter:
+    """Импорт справочника пачками по chunk_size строк.
+
+    На PostgreSQL пачка копируется через COPY во временную таблицу
+    и переносится одним INSERT ... ON CONFLICT, на других базах
+    существующие ключи пачки выбираются одним запросом.
+    """
+
+    def __init__(self, catalog, chunk_size=5000, update=False,
+                 progress=None):
+        self.catalog = catalog
+        self.chunk_size = chunk_size
+        self.update = update and bool(catalog.value_fields)
+        self.progress = progress
+        self.result = ImportResult()
+
+    def run(self, rows):
+        rows = iter(rows)
+        postgres = connection.vendor == 'postgresql'
+        if postgres:
+            self.create_staging()
+        try:
+            while True:
+                batch = list(islice(rows, self.chunk_size))
+                if not batch:
+                    break
+                chunk = {}
+                for row in batch:
+                    values = clean_row(self.catalog, row)
+                    if values is None:
+                        self.result.invalid += 1
+                    else:
+                        chunk[self.get_key(values)] = values
+                with transaction.atomic():
+                    if chunk:
+                        self.drop_conflicts(chunk)
+                    if chunk and postgres:
+                        self.write_postgres(list(chunk.values()))
+                    elif chunk:
+                        self.write_orm(chunk)
+                self.result.read += len(batch)
+                if self.progress:
+                    self.progress(self.result)
+        finally:
+            if postgres:
+                self.drop_staging()
+            if self.result.inserted or self.result.updated:
+                bump_versions(*self.catalog.scopes)
+        return self.result
+
+    def get_key(self, values):
+        return tuple(
+            values[self.catalog.fields.index(field)]
+            for field in self.catalog.key
+        )
+
+    def drop_conflicts(self, chunk):
+        """Убирает из пачки строки, чьи уникальные поля вне ключа
+        совпадают с полями другой строки пачки или справочника."""
+        for field in self.catalog.unique:
+            index = self.catalog.fields.index(field)
+            owners = {}
+            for key, values in list(chunk.items()):
+                if owners.setdefault(values[index], key) != key:
+                    del chunk[key]
+                    self.result.invalid += 1
+            taken = self.catalog.model.objects.filter(**{
+                f'{field}__in': owners
+            }).values_list(field, *self.catalog.key)
+            for value, *key in taken:
+                owner = owners[value]
+                if tuple(key) != owner and owner in chunk:
+                    del chunk[owner]
+                    self.result.invalid += 1
+
+    def stored(self, chunk):
+        """Записи справочника с ключами пачки."""
+        first_key = self.catalog.key[0]
+        instances = self.catalog.model.objects.filter(**{
+            f'{first_key}__in': {key[0] for key in chunk}
+        })
+        stored = {}
+        for instance in instances:
+            key = self.get_key(tuple(
+                getattr(instance, field) for field in self.catalog.fields
+            ))
+            if key in chunk:
+                stored[key] = instance
+        return stored
+
+    def create_staging(self):
+        quote = connection.ops.quote_name
+        columns = ', '.join(map(quote, self.catalog.fields))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {STAGING_TABLE}')
+            cursor.execute(
+                f'CREATE TEMP TABLE {STAGING_TABLE} AS '
+                f'SELECT {columns} FROM {quote(self.catalog.table)} '
+                'WITH NO DATA'
+            )
+
+    def drop_staging(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {STAGING_TABLE}')
+
+    def write_postgres(self, rows):
+        quote = connection.ops.quote_name
+        columns = ', '.join(map(quote, self.catalog.fields))
+        key = ', '.join(map(quote, self.catalog.key))
+        if self.update:
+            assignments = ', '.join(
+                f'{quote(field)} = EXCLUDED.{quote(field)}'
+                for field in self.catalog.value_fields
+            )
+            changed = ' OR '.join(
+                f'{quote(self.catalog.table)}.{quote(field)} '
+                f'IS DISTINCT FROM EXCLUDED.{quote(field)}'
+                for field in self.catalog.value_fields
+            )
+            conflict = f'({key}) DO UPDATE SET {assignments} WHERE {changed}'
+        else:
+            conflict = 'DO NOTHING'
+        copy_rows(STAGING_TABLE, self.catalog.fields, rows)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(self.catalog.table)} ({columns}) '
+                f'SELECT {columns} FROM {STAGING_TABLE} '
+                f'ON CONFLICT {conflict} '
+                'RETURNING (xmax = 0)'
+            )
+            for inserted, in cursor.fetchall():
+                if inserted:
+                    self.result.inserted += 1
+                else:
+                    self.result.updated += 1
+            cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+
+    def write_orm(self, chunk):
+        model = self.catalog.model
+        existing = self.stored(chunk)
+        created = []
+        changed = []
+        for key, values in chunk.items():
+            instance = existing.get(key)
+            data = dict(zip(self.catalog.fields, values))
+            if instance is None:
+                created.append(model(**data))
+            elif self.update and any(
+                getattr(instance, field) != data[field]
+                for field in self.catalog.value_fields
+            ):
+                for field in self.catalog.value_fields:
+                    setattr(instance, field, data[field])
+                changed.append(instance)
+        if created:
+            model.objects.bulk_create(created, ignore_conflicts=True)
+            # ignore_conflicts не сообщает, какие строки вставлены:
+            # часть ключей мог успеть записать параллельный импорт.
+            self.result.inserted += len(self.stored(chunk)) - len(existing)
+        if changed:
+            model.objects.bulk_update(changed, self.catalog.value_fields)
+        self.result.updated += len(changed)
@@ -0,0 +1,54 @@
+from bisect import bisect_left
+from threading import Lock
+
+from recipes.models import Ingredient
+
+MAX_CHAR = '\U0010ffff'
+
+
+class IngredientPrefixIndex:
+    """Отсортированный индекс ингредиентов для поиска по началу названия.
+
+    Ключи приведены через casefold(), поэтому поиск регистронезависим
+    и для кириллицы. Индекс строится при первом обращении и
+    перестраивается, когда меняется общая для всех процессов версия
+    ингредиентов.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = Lock()
+
+    def build(self):
+        ingredients = sorted(
+            Ingredient.objects.order_by().values(
+                'id', 'name', 'measurement_unit'
+            ),
+            key=lambda ingredient: (
+                ingredient['name'].casefold(), ingredient['id']
+            )
+        )
+        keys = [ingredient['name'].casefold() for ingredient in ingredients]
+        return keys, ingredients
+
+    def get_snapshot(self, version):
+        snapshot = self._snapshot
+        if snapshot is None or snapshot[0] != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot[0] != version:
+                    snapshot = self._snapshot = (version, *self.build())
+        return snapshot[1:]
+
+    def clear(self):
+        self._snapshot = None
+
+    def search(self, prefix, version):
+        keys, ingredients = self.get_snapshot(version)
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + MAX_CHAR, start)
+        return ingredients[start:end]
+
+
+ingredient_index = IngredientPrefixIndex()
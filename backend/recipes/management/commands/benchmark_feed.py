@@ -0,0 +1,188 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.test import override_settings
+from django.utils import timezone
+
+from recipes import feeds
+from recipes.management.commands.seed import SEED_IMAGE, explicit_pub_date
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription, User
+
+BENCH_PREFIX = 'feed_bench'
+BACKGROUND_SPAN = timedelta(days=30)
+# Порог, при котором по лентам раскладываются рецепты всех авторов.
+FANOUT_ONLY = 2 ** 31
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the cost of publishing a recipe and reading the first '
+        'feed page for pure fan-out-on-write, the hybrid timeline and '
+        'a naive Recipe x Subscription join, for authors with different '
+        'numbers of followers. All data is rolled back afterwards'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--followers', type=int, nargs='+',
+            default=[10, 100, 1000, 10000, 100000],
+            help='Followers of the measured author, one run per value',
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=5,
+            help='Recipes published by the measured author in each run',
+        )
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Other authors followed by the reader',
+        )
+        parser.add_argument('--recipes-per-author', type=int, default=20)
+        parser.add_argument(
+            '--page-size', type=int,
+            default=settings.REST_FRAMEWORK['PAGE_SIZE'],
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.now = timezone.now()
+        self.stdout.write(
+            f'FEED_FANOUT_MAX_FOLLOWERS={settings.FEED_FANOUT_MAX_FOLLOWERS}'
+        )
+        self.stdout.write(
+            f'{"followers":>9} {"strategy":9} {"publish ms":>11} '
+            f'{"rows":>7} {"page ms":>8}'
+        )
+        with transaction.atomic():
+            followers = self.create_users(max(options['followers']))
+            self.reader = followers[0]
+            self.follow_background()
+            for count in sorted(options['followers']):
+                self.run(followers[:count])
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def next_ids(model, count):
+        """Явные id: bulk_create на SQLite не возвращает их."""
+        start = (
+            model.objects.aggregate(max_id=Max('pk'))['max_id'] or 0
+        ) + 1
+        return range(start, start + count)
+
+    def create_users(self, count, prefix=BENCH_PREFIX):
+        return User.objects.bulk_create(
+            User(
+                pk=pk, username=f'{prefix}_{pk}',
+                email=f'{prefix}_{pk}@foodgram.local',
+                first_name='Feed', last_name='Benchmark', password='!',
+            )
+            for pk in self.next_ids(User, count)
+        )
+
+    def create_recipes(self, author, pub_dates):
+        pub_dates = list(pub_dates)
+        with explicit_pub_date():
+            return Recipe.objects.bulk_create(
+                Recipe(
+                    pk=pk, author=author, name='Рецепт для ленты',
+                    image=SEED_IMAGE, text='Сгенерированный рецепт.',
+                    cooking_time=10, pub_date=pub_date,
+                )
+                for pk, pub_date in zip(
+                    self.next_ids(Recipe, len(pub_dates)), pub_dates
+                )
+            )
+
+    def subscribe(self, subscribers, author):
+        Subscription.objects.bulk_create(
+            Subscription(subscriber=subscriber, author=author)
+            for subscriber in subscribers
+        )
+        User.objects.filter(pk=author.pk).update(
+            followers_count=len(subscribers)
+        )
+
+    def follow_background(self):
+        """Обычные авторы, на которых подписан читатель, с рецептами
+        старше рецептов измеряемого автора."""
+        authors = self.create_users(
+            self.options['follows'], f'{BENCH_PREFIX}_author'
+        )
+        count = self.options['recipes_per_author']
+        step = BACKGROUND_SPAN / max(count * len(authors), 1)
+        for number, author in enumerate(authors):
+            self.create_recipes(author, (
+                self.now - BACKGROUND_SPAN
+                + step * (number + index * len(authors))
+                for index in range(count)
+            ))
+            self.subscribe([self.reader], author)
+        feeds.follow(self.reader.pk, [author.pk for author in authors])
+
+    def run(self, followers):
+        [author] = self.create_users(1, f'{BENCH_PREFIX}_popular')
+        self.subscribe(followers, author)
+        recipes = self.create_recipes(author, (
+            self.now + timedelta(seconds=index)
+            for index in range(self.options['recipes'])
+        ))
+        self.report(len(followers), 'naive', None, None, self.best(
+            self.read_naive
+        ))
+        for strategy, threshold in (
+            ('fan-out', FANOUT_ONLY),
+            ('hybrid', settings.FEED_FANOUT_MAX_FOLLOWERS),
+        ):
+            with override_settings(FEED_FANOUT_MAX_FOLLOWERS=threshold):
+                FeedEntry.objects.filter(author=author).delete()
+                start = time.perf_counter()
+                for recipe in recipes:
+                    feeds.publish(recipe)
+                publish = (time.perf_counter() - start) / len(recipes)
+                rows = FeedEntry.objects.filter(author=author).count()
+                if self.page_ids(self.read_timeline) != self.page_ids(
+                    self.read_naive
+                ):
+                    raise CommandError(
+                        f'{strategy}: feed page differs from the join.'
+                    )
+                self.report(
+                    len(followers), strategy, publish, rows // len(recipes),
+                    self.best(self.read_timeline)
+                )
+
+    def read_naive(self):
+        return list(Recipe.objects.with_user_flags(self.reader).filter(
+            author__authors__subscriber=self.reader
+        ).order_by('-pub_date', '-id')[:self.options['page_size'] + 1])
+
+    def read_timeline(self):
+        return feeds.Timeline(self.reader).fetch(
+            None, False, self.options['page_size'] + 1
+        )
+
+    @staticmethod
+    def page_ids(read):
+        return [recipe.pk for recipe in read()]
+
+    def best(self, read):
+        # Лучший из повторов меньше всего зависит от шума машины.
+        best = float('inf')
+        for _ in range(self.options['repeat']):
+            start = time.perf_counter()
+            read()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def report(self, followers, strategy, publish, rows, page):
+        publish = '-' if publish is None else f'{publish * 1000:.2f}'
+        rows = '-' if rows is None else rows
+        self.stdout.write(
+            f'{followers:>9} {strategy:9} {publish:>11} {rows:>7} '
+            f'{page * 1000:8.2f}'
+        )
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.importers import (
+    CATALOGS,
+    CatalogImporter,
+    detect_format,
+    iter_rows
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream a CSV, JSON or JSON Lines catalog into the database; '
+        'rows that already exist are skipped or, with --update, updated'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalog', choices=sorted(CATALOGS))
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=('csv', 'json', 'jsonl'),
+            help='Defaults to the file extension',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--update', action='store_true')
+
+    def handle(self, *args, **options):
+        catalog = CATALOGS[options['catalog']]
+        path = options['path']
+        importer = CatalogImporter(
+            catalog,
+            chunk_size=options['chunk_size'],
+            update=options['update'],
+            progress=self.report_progress,
+        )
+        try:
+            result = importer.run(iter_rows(
+                path, options['format'] or detect_format(path), catalog.fields
+            ))
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Cannot import {path}: {error}')
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {path}: {result.read} read, {result.inserted} '
+            f'inserted, {result.updated} updated, {result.unchanged} '
+            f'unchanged, {result.invalid} invalid'
+        ))
+
+    def report_progress(self, result):
+        self.stdout.write(f'{result.read} rows', ending='\r')
+        self.stdout.flush()
@@ -1,20 +1,17 @@
-import csv
-
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
-from recipes.models import Ingredient
-
 PATH_CSV = 'data/ingredients.csv'
 
 
 class Command(BaseCommand):
-    help = 'Import data from CSV file into the database'
+    help = 'Import ingredients from CSV or JSON (see import_catalog)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=PATH_CSV)
 
-    def handle(self, *args, **kwargs):
-        objects_to_create = []
-        with open(PATH_CSV, 'r', encoding='utf-8') as file:
-            csv_reader = csv.DictReader(file)
-            for row in csv_reader:
-                objects_to_create.append(Ingredient(**row))
-        Ingredient.objects.bulk_create(objects_to_create, batch_size=500)
-        self.stdout.write(self.style.SUCCESS('Data imported successfully'))
+    def handle(self, *args, **options):
+        call_command(
+            'import_catalog', 'ingredients', options['path'],
+            stdout=self.stdout, stderr=self.stderr
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Build WebP and thumbnail variants of recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Rebuild variants for recipes that already have them',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.order_by('pk')
+        if not options['all']:
+            recipes = recipes.filter(image_thumbnail='')
+        count = 0
+        for recipe_id in recipes.values_list('pk', flat=True).iterator():
+            process_recipe_image(recipe_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {count} images'))
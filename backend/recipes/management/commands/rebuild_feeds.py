@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feeds import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Check the subscription feeds against subscriptions, add missing '
+        'recipes and remove recipes of unfollowed authors'
+    )
+
+    def handle(self, *args, **options):
+        added, removed = rebuild_feeds()
+        if added or removed:
+            self.stdout.write(self.style.WARNING(
+                f'Feeds rebuilt: {added} entries added, {removed} removed'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Feeds are consistent'))
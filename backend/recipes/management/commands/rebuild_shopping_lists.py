@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_lists import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = (
+        'Check the aggregated shopping lists against shopping carts and '
+        'rebuild the lists that differ'
+    )
+
+    def handle(self, *args, **options):
+        fixed = rebuild_shopping_lists()
+        if fixed:
+            self.stdout.write(self.style.WARNING(
+                f'Shopping lists rebuilt for {fixed} users'
+            ))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS('Shopping lists are consistent')
+            )
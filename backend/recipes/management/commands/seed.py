@@ -0,0 +1,261 @@
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from io import BytesIO
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from recipes.counters import recount_counters
+from recipes.feeds import rebuild_feeds
+from recipes.importers import copy_rows
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    IngredientAmount,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from recipes.shopping_lists import rebuild_shopping_lists
+from recipes.versions import RECIPES_SCOPE, bump_versions
+from users.models import Subscription, User
+
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Петр', 'Ольга', 'Сергей', 'Елена')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов')
+DISHES = ('Суп', 'Салат', 'Пирог', 'Рагу', 'Каша', 'Запеканка', 'Омлет')
+ADJECTIVES = ('домашний', 'быстрый', 'летний', 'острый', 'праздничный')
+SEED_PASSWORD = 'seed-password'
+SEED_IMAGE = 'recipes/images/seed.png'
+SEED_IMAGE_SIZE = (64, 64)
+SEED_IMAGE_COLOR = (230, 126, 34)
+PUB_DATE_SPAN = timedelta(days=730)
+# Даты и id не зависят ни от текущего времени, ни от строк в базе:
+# при одном --seed набор данных совпадает на любой базе. Даты
+# отсчитываются от SEED_NOW, сдвинутой на --seed дней.
+SEED_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+SEED_FIRST_ID = 10 ** 6
+USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'password',
+    'is_superuser', 'is_staff', 'is_active', 'date_joined',
+    'recipes_count', 'followers_count',
+)
+RECIPE_FIELDS = (
+    'id', 'author_id', 'name', 'image', 'image_webp', 'image_thumbnail',
+    'text', 'cooking_time', 'pub_date', 'favorites_count',
+)
+
+
+def skewed_index(rng, size, skew):
+    """Индекс из range(size), где малые индексы встречаются чаще.
+
+    Степенное распределение без таблицы весов, поэтому память
+    не зависит от size.
+    """
+    return min(size - 1, int(size * rng.random() ** skew))
+
+
+def distinct_sample(rng, size, count, skew):
+    count = min(count, size)
+    chosen = set()
+    while len(chosen) < count:
+        chosen.add(skewed_index(rng, size, skew))
+    return chosen
+
+
+def save_seed_image():
+    """Общее изображение сгенерированных рецептов, чтобы по ним
+    можно было построить варианты."""
+    if default_storage.exists(SEED_IMAGE):
+        return
+    buffer = BytesIO()
+    Image.new('RGB', SEED_IMAGE_SIZE, SEED_IMAGE_COLOR).save(buffer, 'PNG')
+    default_storage.save(SEED_IMAGE, ContentFile(buffer.getvalue()))
+
+
+@contextmanager
+def explicit_pub_date():
+    """bulk_create иначе перезапишет pub_date текущим временем."""
+    field = Recipe._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset for performance work'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=8,
+            help='Average number of ingredients in a recipe',
+        )
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        self.tag_ids = list(
+            Tag.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        if not self.ingredient_ids or not self.tag_ids:
+            raise CommandError(
+                'Import ingredients and tags before seeding.'
+            )
+        self.now = SEED_NOW + timedelta(days=options['seed'])
+        self.user_start = self.recipe_start = SEED_FIRST_ID
+        for model in (User, Recipe):
+            if model.objects.filter(pk__gte=SEED_FIRST_ID).exists():
+                raise CommandError(
+                    f'{model._meta.db_table} already has rows with id '
+                    f'{SEED_FIRST_ID} or above; seed a fresh database.'
+                )
+        save_seed_image()
+        self.write(User, USER_FIELDS, self.users())
+        with explicit_pub_date():
+            self.write(Recipe, RECIPE_FIELDS, self.recipes())
+        self.write(
+            Recipe.tags.through, ('recipe_id', 'tag_id'), self.recipe_tags()
+        )
+        self.write(
+            IngredientAmount, ('recipe_id', 'ingredient_id', 'amount'),
+            self.ingredient_amounts()
+        )
+        self.write(
+            FavoriteRecipe, ('user_id', 'recipe_id'),
+            self.user_recipes(options['favorites_per_user'])
+        )
+        self.write(
+            ShoppingCart, ('user_id', 'recipe_id'),
+            self.user_recipes(options['cart_per_user'])
+        )
+        self.write(
+            Subscription, ('subscriber_id', 'author_id'),
+            self.subscriptions()
+        )
+        self.reset_sequences()
+        recount_counters()
+        rebuild_shopping_lists()
+        # Ленты раскладываются по followers_count, поэтому после пересчета.
+        rebuild_feeds()
+        bump_versions(RECIPES_SCOPE)
+        self.stdout.write(self.style.SUCCESS('Data seeded successfully'))
+
+    def users(self):
+        password = make_password(SEED_PASSWORD)
+        start = self.user_start
+        for pk in range(start, start + self.options['users']):
+            yield (
+                pk, f'seed_user_{pk}', f'seed_user_{pk}@seed.foodgram.local',
+                self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES),
+                password, False, False, True, self.now, 0, 0,
+            )
+
+    def recipes(self):
+        count = self.options['recipes']
+        users = self.options['users']
+        step = PUB_DATE_SPAN / max(count, 1)
+        start = self.now - PUB_DATE_SPAN
+        for number, pk in enumerate(
+            range(self.recipe_start, self.recipe_start + count)
+        ):
+            yield (
+                pk, self.user_start + skewed_index(self.rng, users, 3),
+                f'{self.rng.choice(DISHES)} {self.rng.choice(ADJECTIVES)} '
+                f'№{pk}',
+                SEED_IMAGE, '', '', 'Сгенерированный рецепт.',
+                self.rng.randint(5, 180), start + step * number, 0,
+            )
+
+    def recipe_ids(self):
+        return range(
+            self.recipe_start, self.recipe_start + self.options['recipes']
+        )
+
+    def recipe_tags(self):
+        for recipe_id in self.recipe_ids():
+            for index in distinct_sample(
+                self.rng, len(self.tag_ids), self.rng.randint(1, 3), 1.5
+            ):
+                yield recipe_id, self.tag_ids[index]
+
+    def ingredient_amounts(self):
+        average = self.options['ingredients_per_recipe']
+        for recipe_id in self.recipe_ids():
+            count = max(1, int(self.rng.gauss(average, average / 3)))
+            for index in distinct_sample(
+                self.rng, len(self.ingredient_ids), count, 2
+            ):
+                yield (
+                    recipe_id, self.ingredient_ids[index],
+                    self.rng.randint(1, 500),
+                )
+
+    def user_recipes(self, average):
+        recipes = self.options['recipes']
+        for user_id in range(
+            self.user_start, self.user_start + self.options['users']
+        ):
+            count = int(self.rng.expovariate(1 / average)) if average else 0
+            for index in distinct_sample(self.rng, recipes, count, 3):
+                yield user_id, self.recipe_start + index
+
+    def subscriptions(self):
+        users = self.options['users']
+        average = self.options['subscriptions_per_user']
+        for subscriber_id in range(self.user_start, self.user_start + users):
+            count = int(self.rng.expovariate(1 / average)) if average else 0
+            for index in distinct_sample(self.rng, users, count, 3):
+                author_id = self.user_start + index
+                if author_id != subscriber_id:
+                    yield subscriber_id, author_id
+
+    def write(self, model, fields, rows):
+        total = 0
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    copy_rows(model._meta.db_table, [
+                        model._meta.get_field(field).column
+                        for field in fields
+                    ], chunk)
+                else:
+                    model.objects.bulk_create(
+                        model(**dict(zip(fields, row))) for row in chunk
+                    )
+            total += len(chunk)
+            self.stdout.write(
+                f'{model._meta.db_table}: {total}', ending='\r'
+            )
+        self.stdout.write(f'{model._meta.db_table}: {total}')
+
+    def reset_sequences(self):
+        """Явные id пользователей и рецептов сдвигают последовательности."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Recipe]
+        )
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
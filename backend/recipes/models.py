@@ -1,10 +1,16 @@
 from colorfield.fields import ColorField
 from django.db import models
+from django.db.models.functions import RowNumber
 from django.core.validators import MinValueValidator
 from django.template.defaultfilters import truncatechars
 
-from foodgram.constants import MAX_LENGTH_NAME, TEXT_LENGTH, DEFAULT_TRUNCATE
-from users.models import User
+from foodgram.constants import (
+    MAX_LENGTH_NAME,
+    TEXT_LENGTH,
+    DEFAULT_TRUNCATE,
+    IMAGE_VARIANTS_PATH
+)
+from users.models import User, Subscription
 
 
 class Tag(models.Model):
@@ -60,6 +66,59 @@ class Ingredient(models.Model):
         return truncatechars(self.name, DEFAULT_TRUNCATE)
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Запросы рецептов."""
+
+    def with_related(self):
+        """Подгружает автора, тэги и ингредиенты фиксированным числом
+        запросов."""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            models.Prefetch(
+                'ingredientamounts',
+                queryset=IngredientAmount.objects.select_related('ingredient')
+            ),
+        )
+
+    def latest_per_author(self, author_ids, limit):
+        """Не более limit последних рецептов каждого автора одним
+        запросом с ROW_NUMBER() OVER (PARTITION BY author_id)."""
+        ranked = self.filter(author_id__in=author_ids).order_by().annotate(
+            row_number=models.Window(
+                expression=RowNumber(),
+                partition_by=models.F('author_id'),
+                order_by=(models.F('pub_date').desc(), models.F('id').desc()),
+            )
+        )
+        sql, params = ranked.query.sql_with_params()
+        return self.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s '
+            'ORDER BY author_id, row_number',
+            (*params, limit)
+        )
+
+    def with_user_flags(self, user):
+        """Аннотирует флаги избранного, корзины и подписки на автора."""
+        if not user.is_authenticated:
+            false = models.Value(False, output_field=models.BooleanField())
+            return self.annotate(
+                is_favorited=false,
+                is_in_shopping_cart=false,
+                author_is_subscribed=false,
+            )
+        return self.annotate(
+            is_favorited=models.Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+            is_in_shopping_cart=models.Exists(ShoppingCart.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+            author_is_subscribed=models.Exists(Subscription.objects.filter(
+                subscriber=user, author=models.OuterRef('author')
+            )),
+        )
+
+
 class Recipe(models.Model):
     """Рецепт."""
 
@@ -78,6 +137,16 @@ class Recipe(models.Model):
         default=None,
         verbose_name='Изображение'
     )
+    image_webp = models.ImageField(
+        upload_to=IMAGE_VARIANTS_PATH,
+        blank=True,
+        verbose_name='Изображение WebP'
+    )
+    image_thumbnail = models.ImageField(
+        upload_to=IMAGE_VARIANTS_PATH,
+        blank=True,
+        verbose_name='Миниатюра'
+    )
     text = models.TextField(verbose_name='Текст')
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -97,12 +166,26 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True, db_index=True, verbose_name='Дата добавления'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0, db_index=True, verbose_name='Счетчик в избранном'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date', ]
         default_related_name = 'recipes'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_idx'
+            ),
+        )
 
     def __str__(self):
         return f'{self.name[:TEXT_LENGTH]}'
@@ -172,3 +255,102 @@ class FavoriteRecipe(ShoppingCartFavoriteBaseModel):
     class Meta(ShoppingCartFavoriteBaseModel.Meta):
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
+
+
+class ShoppingListItem(models.Model):
+    """Ингредиент в списке покупок пользователя.
+
+    Сумма количества ингредиента по всем рецептам корзины, которую
+    поддерживает recipes.shopping_lists.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        default_related_name = 'shoppinglistitems'
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списка покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shoppinglistitem',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.amount}'
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписчика автора.
+
+    Строки раскладывает recipes.feeds при публикации рецепта;
+    pub_date повторяет дату рецепта, чтобы лента читалась
+    по одному индексу.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='authorfeedentries',
+        verbose_name='Автор'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата добавления')
+
+    class Meta:
+        default_related_name = 'feedentries'
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feedentry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feedentry_user_pub_date_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user}: {self.recipe}'
+
+
+class DataVersion(models.Model):
+    """Счетчик изменений данных, общий для всех процессов."""
+
+    scope = models.CharField(
+        max_length=MAX_LENGTH_NAME,
+        primary_key=True,
+        verbose_name='Область'
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Версия'
+    )
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.scope}: {self.version}'
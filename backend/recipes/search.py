@@ -0,0 +1,61 @@
+"""Полнотекстовый поиск рецептов.
+
+На PostgreSQL рецепт хранит tsvector в столбце search_vector с GIN-индексом,
+на SQLite текст индексируется во внешней FTS5-таблице. В обоих случаях
+индекс обновляют триггеры базы при вставке и изменении названия или текста,
+поэтому он актуален и после массовой загрузки в обход ORM. Столбец,
+таблицу и триггеры создает миграция 0006_recipe_search_index.
+Столбец и таблица не описаны в модели, чтобы не выбирать tsvector
+вместе с каждым рецептом.
+"""
+import re
+
+from django.db import connections, models
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'pg_catalog.russian'
+FTS_TABLE = 'recipes_recipe_fts'
+SEARCH_WORD = re.compile(r'\w+')
+
+
+def fts5_query(query):
+    """Слова запроса как префиксы в кавычках: синтаксис FTS5 из
+    пользовательского ввода не интерпретируется."""
+    return ' '.join(f'"{word}"*' for word in SEARCH_WORD.findall(query))
+
+
+def search_recipes(queryset, query):
+    """Оставляет рецепты, подходящие под запрос, и сортирует их
+    по релевантности: совпадения в названии весят больше, чем в тексте."""
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        matches = RawSQL(
+            f'recipes_recipe.search_vector @@ {tsquery}', (query,),
+            output_field=models.BooleanField()
+        )
+        rank = RawSQL(
+            f'ts_rank(recipes_recipe.search_vector, {tsquery})', (query,),
+            output_field=models.FloatField()
+        )
+    elif vendor == 'sqlite':
+        query = fts5_query(query)
+        if not query:
+            return queryset.none()
+        matches = RawSQL(
+            f'recipes_recipe.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)', (query,),
+            output_field=models.BooleanField()
+        )
+        rank = RawSQL(
+            f'(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = recipes_recipe.id)',
+            (query,), output_field=models.FloatField()
+        )
+    else:
+        return queryset.filter(
+            models.Q(name__icontains=query) | models.Q(text__icontains=query)
+        )
+    return queryset.filter(matches).annotate(
+        search_rank=rank
+    ).order_by('-search_rank', '-pub_date', '-id')
@@ -0,0 +1,158 @@
+"""Списки покупок пользователей.
+
+ShoppingListItem хранит сумму каждого ингредиента по рецептам корзины.
+Суммы меняются на разницу при добавлении и удалении рецепта из корзины
+и при изменении ингредиентов рецепта (сериализатором, в админке или
+другим сохранением IngredientAmount), поэтому выгрузка списка читает
+готовые строки по индексу пользователя, без GROUP BY по корзине.
+"""
+from itertools import islice
+
+from django.db import models, transaction
+from django.db.models.functions import Greatest
+
+from recipes.models import IngredientAmount, ShoppingCart, ShoppingListItem
+from users.models import User
+
+CHUNK_SIZE = 1000
+
+
+def recipe_amounts(recipe_ids):
+    """{ингредиент: количество} суммарно по рецептам."""
+    return dict(
+        IngredientAmount.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values('ingredient_id').annotate(
+            total=models.Sum('amount')
+        ).values_list('ingredient_id', 'total').order_by()
+    )
+
+
+def apply_amounts(user_ids, deltas):
+    """Прибавляет к спискам покупок пользователей разницу количества
+    {ингредиент: разница}; user_ids может быть подзапросом."""
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not deltas:
+        return
+    added = [
+        ingredient_id for ingredient_id, delta in deltas.items() if delta > 0
+    ]
+    with transaction.atomic():
+        if added:
+            users = iter(
+                user_ids.values_list('user_id', flat=True).iterator()
+                if isinstance(user_ids, models.QuerySet) else user_ids
+            )
+            while True:
+                chunk = list(islice(users, CHUNK_SIZE))
+                if not chunk:
+                    break
+                ShoppingListItem.objects.bulk_create(
+                    (
+                        ShoppingListItem(
+                            user_id=user_id, ingredient_id=ingredient_id
+                        )
+                        for user_id in chunk for ingredient_id in added
+                    ),
+                    ignore_conflicts=True
+                )
+        # Разошедшийся с корзиной список не должен уходить ниже нуля:
+        # это нарушило бы ограничение на количество до удаления строки.
+        ShoppingListItem.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=list(deltas)
+        ).update(amount=Greatest(models.F('amount') + models.Case(
+            *(
+                models.When(ingredient_id=ingredient_id, then=delta)
+                for ingredient_id, delta in deltas.items()
+            ),
+            default=0,
+            output_field=models.IntegerField(),
+        ), 0))
+        ShoppingListItem.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=list(deltas),
+            amount__lte=0
+        ).delete()
+
+
+def add_recipes(user_id, recipe_ids):
+    apply_amounts([user_id], recipe_amounts(recipe_ids))
+
+
+def remove_recipes(user_id, recipe_ids):
+    apply_amounts([user_id], {
+        ingredient_id: -amount
+        for ingredient_id, amount in recipe_amounts(recipe_ids).items()
+    })
+
+
+def change_recipe(recipe_id, deltas):
+    """Переносит изменение ингредиентов рецепта в списки покупок всех,
+    у кого он в корзине."""
+    apply_amounts(
+        ShoppingCart.objects.filter(recipe_id=recipe_id).values('user_id'),
+        deltas
+    )
+
+
+def rebuild_shopping_lists(chunk_size=CHUNK_SIZE):
+    """Сверяет списки покупок с корзинами и исправляет расхождения.
+
+    Возвращает число пользователей, чьи списки пришлось исправить.
+    """
+    fixed = 0
+    last_id = 0
+    while True:
+        chunk = list(User.objects.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list('pk', flat=True)[:chunk_size])
+        if not chunk:
+            return fixed
+        with transaction.atomic():
+            fixed += rebuild_chunk(chunk)
+        last_id = chunk[-1]
+
+
+def rebuild_chunk(user_ids):
+    expected = {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in IngredientAmount.objects.filter(
+            recipe__shoppingcarts__user__in=user_ids
+        ).values(
+            'recipe__shoppingcarts__user', 'ingredient'
+        ).annotate(
+            total=models.Sum('amount')
+        ).values_list(
+            'recipe__shoppingcarts__user', 'ingredient', 'total'
+        ).order_by()
+    }
+    actual = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingListItem.objects.filter(user_id__in=user_ids)
+    }
+    stale = [
+        item.pk for key, item in actual.items() if key not in expected
+    ]
+    changed = []
+    created = []
+    for (user_id, ingredient_id), amount in expected.items():
+        item = actual.get((user_id, ingredient_id))
+        if item is None:
+            created.append(ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount
+            ))
+        elif item.amount != amount:
+            item.amount = amount
+            changed.append(item)
+    if stale:
+        ShoppingListItem.objects.filter(pk__in=stale).delete()
+    if changed:
+        ShoppingListItem.objects.bulk_update(changed, ('amount',))
+    ShoppingListItem.objects.bulk_create(created)
+    return len(
+        {user_id for user_id, _ in expected.keys() - actual.keys()}
+        | {item.user_id for item in changed}
+        | {user_id for user_id, _ in actual.keys() - expected.keys()}
+    )
@@ -0,0 +1,206 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save
+)
+from django.dispatch import receiver
+
+from recipes import feeds, shopping_lists
+from recipes.counters import change_counter
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    IngredientAmount,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from recipes.versions import (
+    INGREDIENTS_SCOPE,
+    RECIPES_SCOPE,
+    TAGS_SCOPE,
+    author_scope,
+    bump_versions,
+    recipe_scope,
+    user_scope
+)
+from users.models import Subscription, User
+
+# Поля пользователя в авторе рецепта.
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredient_versions(sender, **kwargs):
+    bump_versions(INGREDIENTS_SCOPE)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tag_versions(sender, **kwargs):
+    bump_versions(TAGS_SCOPE)
+
+
+@receiver(post_save, sender=Recipe)
+def bump_recipe_version(sender, instance, created, **kwargs):
+    """Тэги и ингредиенты рецепта меняются вместе с сохранением самого
+    рецепта (сериализатор, админка) в той же транзакции. Общая версия
+    меняется, только когда рецепт появляется в списках."""
+    if created:
+        bump_versions(RECIPES_SCOPE, recipe_scope(instance.pk))
+    else:
+        bump_versions(recipe_scope(instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def bump_recipe_version_on_delete(sender, instance, **kwargs):
+    bump_versions(RECIPES_SCOPE, recipe_scope(instance.pk))
+
+
+@receiver((post_save, post_delete), sender=IngredientAmount)
+def bump_recipe_version_on_ingredients(sender, instance, **kwargs):
+    bump_versions(recipe_scope(instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_version_on_tags(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_versions(recipe_scope(instance.pk))
+    elif pk_set:
+        bump_versions(*(recipe_scope(pk) for pk in pk_set))
+    else:
+        bump_versions(TAGS_SCOPE)
+
+
+@receiver(pre_save, sender=User)
+def check_author_changes(sender, instance, update_fields=None, **kwargs):
+    """Запоминает, изменились ли поля автора, которые видны в рецептах.
+
+    Регистрация, смена пароля и вход версии рецептов не меняют.
+    """
+    instance._author_changes = None
+    fields = [
+        field for field in AUTHOR_FIELDS
+        if update_fields is None or field in update_fields
+    ]
+    if not fields or instance._state.adding:
+        return
+    saved = User.objects.filter(pk=instance.pk).values(*fields).first()
+    if saved is not None and any(
+        saved[field] != getattr(instance, field) for field in fields
+    ):
+        instance._author_changes = saved
+
+
+@receiver(post_save, sender=User)
+def bump_recipe_version_on_author(sender, instance, **kwargs):
+    if getattr(instance, '_author_changes', None) is None:
+        return
+    instance._author_changes = None
+    bump_versions(author_scope(instance.pk))
+
+
+@receiver((post_save, post_delete), sender=FavoriteRecipe)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def bump_user_version(sender, instance, **kwargs):
+    bump_versions(user_scope(instance.user_id))
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def bump_subscriber_version(sender, instance, **kwargs):
+    bump_versions(user_scope(instance.subscriber_id))
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def increment_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def decrement_favorites_count(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Subscription)
+def increment_followers_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def decrement_followers_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        shopping_lists.add_recipes(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    """После удаления: при каскадном удалении рецепта его ингредиенты,
+    удаленные раньше корзины, уже вычел change_shopping_lists."""
+    shopping_lists.remove_recipes(instance.user_id, [instance.recipe_id])
+
+
+@receiver(pre_save, sender=IngredientAmount)
+def remember_ingredient_amount(sender, instance, **kwargs):
+    instance._saved_amount = None
+    if not instance._state.adding:
+        instance._saved_amount = IngredientAmount.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver((post_save, post_delete), sender=IngredientAmount)
+def change_shopping_lists(sender, instance, signal, **kwargs):
+    """Изменение ингредиентов рецепта через админку и ORM; bulk-операции
+    сериализатора переносят разницу сами."""
+    deltas = {}
+    saved = getattr(instance, '_saved_amount', None)
+    if saved is not None:
+        deltas[saved[0]] = -saved[1]
+    instance._saved_amount = None
+    amount = instance.amount if signal is post_save else -instance.amount
+    deltas[instance.ingredient_id] = (
+        deltas.get(instance.ingredient_id, 0) + amount
+    )
+    shopping_lists.change_recipe(instance.recipe_id, deltas)
+
+
+@receiver(post_save, sender=Recipe)
+def publish_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        feeds.publish(instance)
+
+
+@receiver(post_save, sender=Subscription)
+def add_to_feed(sender, instance, created, **kwargs):
+    """После increment_followers_count: автор, ставший популярным,
+    в ленту не раскладывается."""
+    if created:
+        feeds.follow(instance.subscriber_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_from_feed(sender, instance, **kwargs):
+    """После decrement_followers_count: автор, снова ставший обычным,
+    раскладывается по лентам."""
+    feeds.unfollow(instance.subscriber_id, [instance.author_id])
@@ -0,0 +1,57 @@
+from django.db.models import F
+from django.utils import timezone
+
+from recipes.models import DataVersion
+
+RECIPES_SCOPE = 'recipes'
+TAGS_SCOPE = 'tags'
+INGREDIENTS_SCOPE = 'ingredients'
+
+
+def user_scope(user_id):
+    """Область флагов избранного, корзины и подписок пользователя."""
+    return f'user:{user_id}'
+
+
+def recipe_scope(recipe_id):
+    """Область рецепта: название, текст, изображения, тэги, ингредиенты."""
+    return f'recipe:{recipe_id}'
+
+
+def author_scope(author_id):
+    """Область профиля автора в рецептах."""
+    return f'author:{author_id}'
+
+
+def recipe_body_scopes(recipe):
+    """Области, от которых зависит не зависящая от пользователя часть
+    рецепта."""
+    return (
+        recipe_scope(recipe.pk), author_scope(recipe.author_id),
+        TAGS_SCOPE, INGREDIENTS_SCOPE,
+    )
+
+
+def bump_versions(*scopes):
+    """Увеличивает версии областей в текущей транзакции."""
+    for scope in scopes:
+        updated = DataVersion.objects.filter(scope=scope).update(
+            version=F('version') + 1, modified=timezone.now()
+        )
+        if not updated:
+            DataVersion.objects.bulk_create(
+                [DataVersion(scope=scope)], ignore_conflicts=True
+            )
+            DataVersion.objects.filter(scope=scope).update(
+                version=F('version') + 1, modified=timezone.now()
+            )
+
+
+def get_versions(scopes):
+    """Возвращает {область: (версия, дата изменения)} одним запросом."""
+    return {
+        scope: (version, modified)
+        for scope, version, modified in DataVersion.objects.filter(
+            scope__in=scopes
+        ).values_list('scope', 'version', 'modified')
+    }
@@ -29,6 +29,12 @@ class User(AbstractUser):
     last_name = models.CharField(
         'Last Name', max_length=FIELD_NAMES_LEN
     )
+    recipes_count = models.PositiveIntegerField(
+        'Recipes count', default=0, db_index=True
+    )
+    followers_count = models.PositiveIntegerField(
+        'Followers count', default=0, db_index=True
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name',)
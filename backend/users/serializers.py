@@ -4,6 +4,7 @@ from rest_framework.validators import UniqueTogetherValidator
 from djoser.serializers import UserSerializer
 
 from .models import Subscription
+from api.memberships import get_memberships
 from api.serializers import ReadShortRecipeSerializer
 
 User = get_user_model()
@@ -14,13 +15,10 @@ class FoodgramUserSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, obj):
-        if not self.context['request'].user.is_authenticated:
+        memberships = get_memberships(self.context['request'])
+        if memberships is None:
             return False
-        subscriber = self.context['request'].user
-        if Subscription.objects.filter(subscriber=subscriber,
-                                       author=obj).exists():
-            return True
-        return False
+        return memberships.is_subscribed(obj)
 
     class Meta:
         model = User
@@ -39,7 +37,6 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -53,6 +50,7 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             'recipes',
             'recipes_count',
         )
+        read_only_fields = ('recipes_count',)
         validators = [
             UniqueTogetherValidator(
                 queryset=Subscription.objects.all(),
@@ -60,23 +58,25 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             )
         ]
 
-    def get_recipes_count(self, author):
-        return author.recipes.count()
-
     def get_recipes(self, author):
-        request = self.context.get('request')
-        recipes_limit = request.GET.get('recipes_limit')
-        recipes = author.recipes.all()
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
+        if hasattr(author, 'latest_recipes'):
+            recipes = author.latest_recipes
+        else:
+            request = self.context.get('request')
+            recipes_limit = request.GET.get('recipes_limit')
+            recipes = author.recipes.all()
+            if recipes_limit:
+                recipes = recipes[:int(recipes_limit)]
         serializer = ReadShortRecipeSerializer(recipes, many=True)
         return serializer.data
 
     def get_is_subscribed(self, author):
-        subscriber = self.context.get('request').user
-        return Subscription.objects.filter(
-            subscriber=subscriber, author=author
-        ).exists()
+        if hasattr(author, 'is_subscribed'):
+            return author.is_subscribed
+        memberships = get_memberships(self.context.get('request'))
+        if memberships is None:
+            return False
+        return memberships.is_subscribed(author)
 
 
 class WriteSubscriptionSerializer(serializers.ModelSerializer):
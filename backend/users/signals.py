@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.authentication import token_cache
+from users.models import User
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """Выход через djoser (token/logout) удаляет токен."""
+    token_cache.evict_key(instance.key)
+
+
+@receiver((post_save, post_delete), sender=User)
+def evict_user_tokens(sender, instance, **kwargs):
+    """Смена пароля, деактивация, удаление и правка профиля."""
+    token_cache.evict_user(instance.pk)
@@ -1,3 +1,7 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import BooleanField, Value
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -5,14 +9,36 @@ from rest_framework.response import Response
 from djoser.views import UserViewSet
 from django.shortcuts import get_object_or_404
 
+from recipes.models import Recipe
 from users.models import User, Subscription
 from .serializers import SubscriptionSerializer, WriteSubscriptionSerializer
+from api import bulk
 from api.paginations import LimitPageNumberPagination
+from api.serializers import BulkIdsSerializer
+from foodgram.replicas import ReplicaReadMixin
+
+
+def attach_latest_recipes(authors, recipes_limit):
+    """Раскладывает по авторам их последние рецепты одним запросом."""
+    author_ids = [author.pk for author in authors]
+    if recipes_limit:
+        recipes = Recipe.objects.latest_per_author(
+            author_ids, int(recipes_limit)
+        )
+    else:
+        recipes = Recipe.objects.filter(author_id__in=author_ids)
+    latest_recipes = defaultdict(list)
+    for recipe in recipes:
+        latest_recipes[recipe.author_id].append(recipe)
+    for author in authors:
+        author.latest_recipes = latest_recipes[author.pk]
 
 
-class FoodgramUserViewSet(UserViewSet):
+class FoodgramUserViewSet(ReplicaReadMixin, UserViewSet):
     """ViewSet пользователя."""
 
+    replica_actions = ('subscriptions',)
+
     @action(
         ("GET", "PUT", "PATCH", "DELETE", ), detail=False,
         permission_classes=(IsAuthenticated, ),
@@ -38,18 +64,42 @@ class FoodgramUserViewSet(UserViewSet):
             data={'subscriber': request.user.pk, 'author': author.pk},
             context={'request': request}
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            # По очереди с пакетными подписками того же пользователя.
+            bulk.lock_user(request.user)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(
+        detail=False, permission_classes=(IsAuthenticated, ),
+        methods=('POST', ), url_path='subscribe', url_name='subscribe-bulk',
+    )
+    def subscribe_bulk(self, request):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            bulk.subscribe(request.user, serializer.validated_data['ids'])
+        )
+
+    @subscribe_bulk.mapping.delete
+    def delete_subscribe_bulk(self, request):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            bulk.unsubscribe(request.user, serializer.validated_data['ids'])
+        )
+
     @subscribe.mapping.delete
     def delete_subscribe(self, request, id=None):
         author = get_object_or_404(User, pk=id)
         subscription = Subscription.objects.filter(
             subscriber=request.user, author=author
         )
-        if subscription.exists():
-            subscription.delete()
+        with transaction.atomic():
+            bulk.lock_user(request.user)
+            deleted, _ = subscription.delete()
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'error': 'Вы не подписаны на этого пользователя.'},
@@ -61,9 +111,15 @@ class FoodgramUserViewSet(UserViewSet):
         pagination_class=LimitPageNumberPagination,
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(authors__subscriber=self.request.user)
+        queryset = User.objects.filter(
+            authors__subscriber=self.request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('id')
+        authors = self.paginate_queryset(queryset)
+        attach_latest_recipes(authors, request.GET.get('recipes_limit'))
         serializer = SubscriptionSerializer(
-            self.paginate_queryset(queryset),
+            authors,
             context={'request': request},
             many=True,
         )